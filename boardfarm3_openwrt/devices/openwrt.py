@@ -1,17 +1,31 @@
 """OpenWRT device module."""
 
+from __future__ import annotations
+
 import logging
-from argparse import Namespace
 from ipaddress import IPv4Address, IPv4Network
+from typing import TYPE_CHECKING
 
 from boardfarm3 import hookimpl
 from boardfarm3.devices.base_devices.boardfarm_device import BoardfarmDevice
-from boardfarm3.lib.boardfarm_pexpect import BoardfarmPexpect
 
 from boardfarm3_openwrt.lib.openwrt_hw import OpenWRTHW
 from boardfarm3_openwrt.lib.openwrt_sw import OpenWRTSW
+from boardfarm3_openwrt.lib.readiness import (
+    DNSProbe,
+    InterfaceProbe,
+    ReadinessChecker,
+    ReadinessProbe,
+    ServiceProbe,
+    parse_probes,
+)
 from boardfarm3_openwrt.templates.openwrt.openwrt import OpenWRT as OpenWRTTemplate
 
+if TYPE_CHECKING:
+    from argparse import Namespace
+
+    from boardfarm3.lib.boardfarm_pexpect import BoardfarmPexpect
+
 _LOGGER = logging.getLogger(__name__)
 
 
@@ -39,6 +53,7 @@ class OpenWRT(BoardfarmDevice, OpenWRTTemplate):
         )
         self._hw.connect_to_console(self.device_name)
         self._sw = OpenWRTSW(self._hw)
+        self.wait_for_ready()
 
     @hookimpl(tryfirst=True)
     async def boardfarm_skip_boot_async(self) -> None:
@@ -50,6 +65,80 @@ class OpenWRT(BoardfarmDevice, OpenWRTTemplate):
         )
         await self._hw.connect_to_console_async(self.device_name)
         self._sw = OpenWRTSW(self._hw)
+        time_to_ready = await self._get_readiness_checker().wait_async(
+            self._readiness_timeout,
+        )
+        _LOGGER.info("%s ready in %.1fs", self.device_name, time_to_ready)
+
+    @property
+    def _readiness_timeout(self) -> float:
+        """Seconds the device is given to become ready after login.
+
+        :return: readiness timeout
+        :rtype: float
+        """
+        return float(self._config.get("readiness_timeout", 180))
+
+    @property
+    def readiness_probes(self) -> list[ReadinessProbe]:
+        """Probes which must pass before the device is ready.
+
+        Taken from the ``readiness_probes`` device config if present. The
+        default probes only cover the LAN side, so that setups without a WAN
+        become ready as well; the DNS probe queries dnsmasq on the device
+        itself, which answers without a WAN.
+
+        :return: readiness probes
+        :rtype: list[ReadinessProbe]
+        """
+        if (probe_configs := self._config.get("readiness_probes")) is not None:
+            return parse_probes(probe_configs)
+        return [
+            InterfaceProbe(self.lan_iface),
+            ServiceProbe("network"),
+            ServiceProbe("dnsmasq"),
+            ServiceProbe("odhcpd"),
+            DNSProbe(),
+        ]
+
+    def _get_readiness_checker(
+        self,
+        probes: list[ReadinessProbe] | None = None,
+    ) -> ReadinessChecker:
+        """Return a readiness checker running on the device console.
+
+        :param probes: probes to be evaluated, defaults to readiness_probes
+        :type probes: list[ReadinessProbe] | None
+        :return: readiness checker
+        :rtype: ReadinessChecker
+        """
+        return ReadinessChecker(
+            self.hw.get_console(),
+            self.readiness_probes if probes is None else probes,
+        )
+
+    def wait_for_ready(
+        self,
+        probes: list[ReadinessProbe] | None = None,
+        timeout: float | None = None,
+    ) -> float:
+        """Wait until the device services are up.
+
+        All probes are evaluated in one console command per poll, with
+        exponentially spaced polls, until they pass or the timeout expires.
+
+        :param probes: probes to be evaluated, defaults to readiness_probes
+        :type probes: list[ReadinessProbe] | None
+        :param timeout: seconds to wait, defaults to readiness_timeout config
+        :type timeout: float | None
+        :return: seconds it took the device to become ready
+        :rtype: float
+        """
+        time_to_ready = self._get_readiness_checker(probes).wait(
+            self._readiness_timeout if timeout is None else timeout,
+        )
+        _LOGGER.info("%s ready in %.1fs", self.device_name, time_to_ready)
+        return time_to_ready
 
     @property
     def hw(self) -> OpenWRTHW:  # pylint: disable=invalid-name
@@ -0,0 +1,94 @@
+"""Base of the device commands streamed back over a dedicated SSH channel."""
+
+from __future__ import annotations
+
+import logging
+import threading
+from abc import ABC, abstractmethod
+from typing import IO, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from boardfarm3_openwrt.lib.ssh_channel import SSHChannel
+    from boardfarm3_openwrt.templates.openwrt.openwrt_hw import OpenWRTHW
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class ChannelReader(ABC):
+    """Command running on a dedicated SSH channel, drained by a reader thread.
+
+    The reader thread consumes the command output until the command exits or
+    is stopped. The subclasses keep the state built from the output under
+    ``_condition``, which is notified when the stream ends; ``_running`` is
+    False from then on.
+    """
+
+    def __init__(self, hardware: OpenWRTHW) -> None:
+        """Initialize the channel reader.
+
+        :param hardware: OpenWRT hardware instance
+        :type hardware: OpenWRTHW
+        """
+        self._hw = hardware
+        self._condition = threading.Condition()
+        self._channel: SSHChannel | None = None
+        self._reader: threading.Thread | None = None
+        self._running = False
+
+    @abstractmethod
+    def _consume(self, stream: IO[bytes]) -> None:
+        """Consume the command output until the end of the stream.
+
+        :param stream: command stdout
+        :type stream: IO[bytes]
+        """
+        raise NotImplementedError
+
+    def _open_channel(self, command: str) -> SSHChannel:
+        """Start the command on a dedicated SSH channel.
+
+        :param command: command to be executed on the device
+        :type command: str
+        :return: started SSH channel
+        :rtype: SSHChannel
+        """
+        self._channel = self._hw.open_ssh_channel(command)
+        return self._channel
+
+    def _start_reader(self, name: str) -> None:
+        """Start the thread draining the channel.
+
+        :param name: reader thread name
+        :type name: str
+        """
+        self._running = True
+        self._reader = threading.Thread(
+            target=self._read_stream,
+            name=name,
+            daemon=True,
+        )
+        self._reader.start()
+
+    def _read_stream(self) -> None:
+        """Consume the channel output, then wake up the waiters."""
+        try:
+            self._consume(self._channel.stdout)
+        except (OSError, ValueError):
+            _LOGGER.exception("%s aborted", threading.current_thread().name)
+        finally:
+            with self._condition:
+                self._running = False
+                self._condition.notify_all()
+
+    def _join_reader(self) -> None:
+        """Wait for the reader thread, unless called from it."""
+        if self._reader is not None and self._reader is not threading.current_thread():
+            self._reader.join()
+
+    def stop(self) -> None:
+        """Stop the command, the state read so far is kept."""
+        if self._channel is None:
+            return
+        self._channel.terminate()
+        self._join_reader()
+        self._channel.close()
@@ -0,0 +1,234 @@
+"""Record and replay of OpenWRT console sessions.
+
+A recording is a gzipped JSON lines file, one ``{"command", "output",
+"duration"}`` record per ``execute_command`` call. The replay console indexes
+the records by command on load and answers each command with its recorded
+outputs in order, so the device interaction code can be run offline.
+
+Only the ``execute_command`` API of the console is recorded, along with the
+login and close calls. The other console APIs (``sendline``, ``expect``,
+``interactive``, ...) are passed through to a live console while recording,
+with a warning that the session cannot be replayed, and raise on the replay
+console. The dedicated SSH channels are not part of a recording.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import gzip
+import json
+import logging
+import time
+from collections import defaultdict, deque
+from typing import IO, TYPE_CHECKING, Any, NoReturn, Protocol
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from boardfarm3.lib.boardfarm_pexpect import BoardfarmPexpect
+
+_LOGGER = logging.getLogger(__name__)
+_REPLAYABLE_API = (
+    "execute_command",
+    "login_to_server",
+    "login_to_server_async",
+    "close",
+)
+
+
+class Console(Protocol):
+    """Console API covered by a recording."""
+
+    def execute_command(self, command: str, timeout: int = -1) -> str:
+        """Execute a command and return its output.
+
+        :param command: command to be executed
+        :param timeout: seconds to wait for the command
+        """
+
+    def login_to_server(self, password: str | None = None) -> None:
+        """Log in to the console.
+
+        :param password: login password
+        """
+
+    async def login_to_server_async(self, password: str | None = None) -> None:
+        """Log in to the console.
+
+        :param password: login password
+        """
+
+    def close(self) -> None:
+        """Close the console."""
+
+
+def _raise_not_replayable(name: str) -> NoReturn:
+    """Raise the error of a console API a recording does not cover.
+
+    :param name: console attribute name
+    :type name: str
+    :raises AttributeError: always
+    """
+    err_msg = (
+        f"Console {name!r} is not replayable, recordings only cover "
+        f"{', '.join(_REPLAYABLE_API)}"
+    )
+    raise AttributeError(err_msg)
+
+
+class RecordingConsole:
+    """Console wrapper saving each command, its output and its timing."""
+
+    def __init__(self, console: BoardfarmPexpect, recording_file: str | Path) -> None:
+        """Initialize the recording console.
+
+        :param console: console to be recorded
+        :type console: BoardfarmPexpect
+        :param recording_file: recording file, overwritten if it exists
+        :type recording_file: str | Path
+        """
+        self._console = console
+        self._file: IO[str] = gzip.open(  # noqa: SIM115
+            recording_file,
+            "wt",
+            encoding="utf-8",
+        )
+        self.device_time = 0.0
+        self._unrecorded: set[str] = set()
+
+    def __getattr__(self, name: str) -> Any:  # noqa: ANN401
+        """Pass the console APIs which are not recorded through.
+
+        The recorded session then depends on an interaction its replay cannot
+        answer, which is logged once per API.
+
+        :param name: attribute name
+        :type name: str
+        :raises AttributeError: on private attributes, which are not passed
+        :return: attribute of the recorded console
+        :rtype: Any
+        """
+        if name.startswith("_"):
+            raise AttributeError(name)
+        if name not in self._unrecorded:
+            self._unrecorded.add(name)
+            _LOGGER.warning(
+                "Console %r is not recorded, the session cannot be replayed",
+                name,
+            )
+        return getattr(self._console, name)
+
+    def execute_command(self, command: str, timeout: int = -1) -> str:
+        """Execute a command on the console and record it.
+
+        :param command: command to be executed
+        :type command: str
+        :param timeout: timeout for the command, defaults to -1
+        :type timeout: int
+        :return: command output
+        :rtype: str
+        """
+        start = time.monotonic()
+        output = self._console.execute_command(command, timeout)
+        duration = time.monotonic() - start
+        self.device_time += duration
+        record = {"command": command, "output": output, "duration": duration}
+        self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self._file.flush()
+        return output
+
+    def login_to_server(self, password: str | None = None) -> None:
+        """Log in to the recorded console, the login is not recorded.
+
+        :param password: login password, defaults to None
+        :type password: str | None
+        """
+        self._console.login_to_server(password)
+
+    async def login_to_server_async(self, password: str | None = None) -> None:
+        """Log in to the recorded console, the login is not recorded.
+
+        :param password: login password, defaults to None
+        :type password: str | None
+        """
+        await self._console.login_to_server_async(password)
+
+    def close(self) -> None:
+        """Close the recording and the recorded console."""
+        if not self._file.closed:
+            self._file.close()
+        self._console.close()
+
+
+class ReplayConsole:
+    """Console answering commands from a recording."""
+
+    def __init__(self, recording_file: str | Path, realtime: bool = False) -> None:
+        """Initialize the replay console.
+
+        :param recording_file: recording made by :class:`RecordingConsole`
+        :type recording_file: str | Path
+        :param realtime: replay with the recorded command durations,
+            defaults to False (answer instantly)
+        :type realtime: bool
+        """
+        self._realtime = realtime
+        self._records: dict[str, deque[tuple[str, float]]] = defaultdict(deque)
+        with gzip.open(recording_file, "rt", encoding="utf-8") as recording:
+            for line in recording:
+                record = json.loads(line)
+                self._records[record["command"]].append(
+                    (record["output"], record["duration"]),
+                )
+        self.device_time = 0.0
+
+    def __getattr__(self, name: str) -> NoReturn:
+        """Refuse the console APIs which are not replayable.
+
+        :param name: attribute name
+        :type name: str
+        """
+        _raise_not_replayable(name)
+
+    def execute_command(self, command: str, timeout: int = -1) -> str:  # noqa: ARG002
+        """Return the next recorded output of a command.
+
+        :param command: command to be replayed
+        :type command: str
+        :param timeout: ignored, kept for console API compatibility
+        :type timeout: int
+        :raises ValueError: if the command has no recorded output left
+        :return: recorded command output
+        :rtype: str
+        """
+        if not self._records.get(command):
+            err_msg = f"No recorded output left for command {command!r}"
+            raise ValueError(err_msg)
+        output, duration = self._records[command].popleft()
+        self.device_time += duration
+        if self._realtime:
+            time.sleep(duration)
+        return output
+
+    def login_to_server(self, password: str | None = None) -> None:
+        """Nothing to log in to when replaying.
+
+        :param password: ignored, kept for console API compatibility
+        :type password: str | None
+        """
+
+    async def login_to_server_async(
+        self,
+        password: str | None = None,  # noqa: ARG002
+    ) -> None:
+        """Nothing to log in to when replaying.
+
+        :param password: ignored, kept for console API compatibility
+        :type password: str | None
+        """
+        await asyncio.sleep(0)
+
+    def close(self) -> None:
+        """Report unused records, a sign the replayed flow has diverged."""
+        if unused := sum(len(outputs) for outputs in self._records.values()):
+            _LOGGER.warning("%d recorded console commands were not replayed", unused)
@@ -0,0 +1,401 @@
+"""Bulk file transfer to and from an OpenWRT device over streamed tar.
+
+Files are moved as a single, optionally gzipped, tar stream on a dedicated
+SSH channel and are never held in memory as a whole archive. A manifest of
+the device files (size and MD5) is fetched in one command beforehand to skip
+the files which are already up to date and to check each transferred file.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import posixpath
+import shlex
+import tarfile
+import threading
+from pathlib import Path
+from typing import IO, TYPE_CHECKING, NamedTuple
+
+from boardfarm3.exceptions import DeviceConnectionError
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from boardfarm3_openwrt.templates.openwrt.openwrt_hw import OpenWRTHW
+
+_LOGGER = logging.getLogger(__name__)
+_CHUNK_SIZE = 65536
+_SIZES_MARKER = "__sizes__"
+
+
+class FileDigest(NamedTuple):
+    """Size and MD5 digest of a file."""
+
+    size: int
+    md5: str
+
+
+class _HashingReader:
+    """File object wrapper computing the MD5 of the bytes read through it."""
+
+    def __init__(self, fileobj: IO[bytes]) -> None:
+        """Initialize the hashing reader.
+
+        :param fileobj: file object to be read
+        :type fileobj: IO[bytes]
+        """
+        self._fileobj = fileobj
+        self.md5 = hashlib.md5()  # noqa: S324
+
+    def read(self, size: int = -1) -> bytes:
+        """Read from the wrapped file object and update the digest.
+
+        :param size: number of bytes to read, defaults to -1 (all)
+        :type size: int
+        :return: bytes read
+        :rtype: bytes
+        """
+        data = self._fileobj.read(size)
+        self.md5.update(data)
+        return data
+
+
+def get_local_digest(path: Path) -> FileDigest:
+    """Return the size and MD5 of a local file, reading it in chunks.
+
+    :param path: local file
+    :type path: Path
+    :return: size and MD5 digest
+    :rtype: FileDigest
+    """
+    md5 = hashlib.md5()  # noqa: S324
+    with path.open("rb") as local_file:
+        while chunk := local_file.read(_CHUNK_SIZE):
+            md5.update(chunk)
+    return FileDigest(path.stat().st_size, md5.hexdigest())
+
+
+def _is_up_to_date(path: Path, digest: FileDigest | None) -> bool:
+    """Check a local file against a device file digest.
+
+    The file is only hashed when its size matches.
+
+    :param path: local file
+    :type path: Path
+    :param digest: digest of the device file, None if missing on the device
+    :type digest: FileDigest | None
+    :return: True if both files have the same content
+    :rtype: bool
+    """
+    if digest is None or not path.is_file() or path.stat().st_size != digest.size:
+        return False
+    return get_local_digest(path).md5 == digest.md5
+
+
+def _run(hardware: OpenWRTHW, command: str) -> str:
+    """Run a command on a dedicated SSH channel and return its output.
+
+    :param hardware: OpenWRT hardware instance
+    :type hardware: OpenWRTHW
+    :param command: command to be executed
+    :type command: str
+    :return: command output
+    :rtype: str
+    """
+    channel = hardware.open_ssh_channel(command)
+    try:
+        output = channel.stdout.read().decode(errors="replace")
+        channel.wait()
+    finally:
+        channel.close()
+    return output
+
+
+def parse_md5sum_output(output: str) -> dict[str, str]:
+    """Parse ``md5sum`` output into a path to digest mapping.
+
+    :param output: md5sum output
+    :type output: str
+    :return: path -> MD5 digest
+    :rtype: dict[str, str]
+    """
+    digests = {}
+    for line in output.splitlines():
+        digest, _, path = line.strip().partition("  ")
+        if len(digest) == 32 and path.startswith("/"):  # noqa: PLR2004
+            digests[path] = digest
+    return digests
+
+
+def get_remote_digests(
+    hardware: OpenWRTHW,
+    remote_paths: Iterable[str],
+) -> dict[str, FileDigest]:
+    """Return size and MD5 of the regular files under the given device paths.
+
+    The manifest is built by a single command on a dedicated SSH channel.
+
+    :param hardware: OpenWRT hardware instance
+    :type hardware: OpenWRTHW
+    :param remote_paths: device files or directories, missing ones are ignored
+    :type remote_paths: Iterable[str]
+    :return: device path -> size and MD5 digest
+    :rtype: dict[str, FileDigest]
+    """
+    quoted_paths = " ".join(shlex.quote(path) for path in remote_paths)
+    if not quoted_paths:
+        return {}
+    find = f"find {quoted_paths} -type f -exec"
+    output = _run(
+        hardware,
+        f"{find} md5sum {{}} + 2>/dev/null; echo {_SIZES_MARKER}; "
+        f"{find} wc -c {{}} + 2>/dev/null; true",
+    )
+    md5_output, _, size_output = output.partition(_SIZES_MARKER)
+    sizes = {}
+    for line in size_output.splitlines():
+        size, _, path = line.strip().partition(" ")
+        if path.startswith("/"):
+            sizes[path] = int(size)
+    return {
+        path: FileDigest(sizes[path], md5)
+        for path, md5 in parse_md5sum_output(md5_output).items()
+        if path in sizes
+    }
+
+
+def _iter_local_files(local_paths: Iterable[str | Path]) -> Iterable[tuple[Path, str]]:
+    """Yield the local files to be pushed along with their archive name.
+
+    Directories are walked recursively and keep their own name, like
+    ``scp -r`` does.
+
+    :param local_paths: local files or directories
+    :type local_paths: Iterable[str | Path]
+    :yield: local file and its path relative to the destination directory
+    """
+    for local_path in map(Path, local_paths):
+        if not local_path.is_dir():
+            yield local_path, local_path.name
+            continue
+        for file_path in sorted(local_path.rglob("*")):
+            if file_path.is_file():
+                yield file_path, file_path.relative_to(local_path.parent).as_posix()
+
+
+def _pushed_roots(remote_dir: str, arcnames: Iterable[str]) -> list[str]:
+    """Return the device paths of the pushed files and top level directories.
+
+    The manifests are built from these roots, one per pushed local path, so
+    the command line does not grow with the number of files.
+
+    :param remote_dir: device destination directory
+    :type remote_dir: str
+    :param arcnames: paths of the pushed files, relative to ``remote_dir``
+    :type arcnames: Iterable[str]
+    :return: device files and directories
+    :rtype: list[str]
+    """
+    return sorted(
+        {posixpath.join(remote_dir, arcname.split("/", 1)[0]) for arcname in arcnames},
+    )
+
+
+def _write_names(stream: IO[bytes], names: Iterable[str]) -> None:
+    """Write one file name per line and close the stream.
+
+    :param stream: command standard input
+    :type stream: IO[bytes]
+    :param names: file names
+    :type names: Iterable[str]
+    """
+    try:
+        for name in names:
+            stream.write(f"{name}\n".encode())
+    except (OSError, ValueError):
+        _LOGGER.debug("File list not fully written, the command has exited")
+    finally:
+        try:
+            stream.close()
+        except OSError:
+            _LOGGER.debug("Standard input already broken")
+
+
+def push_files(
+    hardware: OpenWRTHW,
+    local_paths: Iterable[str | Path],
+    remote_dir: str,
+    compress: bool = True,
+) -> list[str]:
+    """Push local files into a device directory in a single tar stream.
+
+    :param hardware: OpenWRT hardware instance
+    :type hardware: OpenWRTHW
+    :param local_paths: local files or directories
+    :type local_paths: Iterable[str | Path]
+    :param remote_dir: absolute device directory, created if needed
+    :type remote_dir: str
+    :param compress: gzip the stream, defaults to True
+    :type compress: bool
+    :raises DeviceConnectionError: if a pushed file does not match on the device
+    :return: device paths of the pushed files, up to date ones excluded
+    :rtype: list[str]
+    """
+    files = {
+        posixpath.join(remote_dir, arcname): (local_path, arcname)
+        for local_path, arcname in _iter_local_files(local_paths)
+    }
+    remote_digests = get_remote_digests(
+        hardware,
+        _pushed_roots(remote_dir, (arcname for _, arcname in files.values())),
+    )
+    pending = {
+        remote_path: local
+        for remote_path, local in files.items()
+        if not _is_up_to_date(local[0], remote_digests.get(remote_path))
+    }
+    if not pending:
+        return []
+    flag = "z" if compress else ""
+    channel = hardware.open_ssh_channel(
+        f"mkdir -p {shlex.quote(remote_dir)} && "
+        f"tar -x{flag}f - -C {shlex.quote(remote_dir)}",
+        with_stdin=True,
+    )
+    local_digests = {}
+    try:
+        with (
+            tarfile.open(fileobj=channel.stdin, mode="w|gz")
+            if compress
+            else tarfile.open(fileobj=channel.stdin, mode="w|")
+        ) as tar:
+            for remote_path, (local_path, arcname) in pending.items():
+                with local_path.open("rb") as local_file:
+                    reader = _HashingReader(local_file)
+                    tar.addfile(tar.gettarinfo(local_path, arcname), reader)
+                local_digests[remote_path] = reader.md5.hexdigest()
+        channel.wait()
+    finally:
+        channel.close()
+    pushed_digests = get_remote_digests(
+        hardware,
+        _pushed_roots(remote_dir, (arcname for _, arcname in pending.values())),
+    )
+    if corrupted := [
+        path
+        for path, md5 in local_digests.items()
+        if path not in pushed_digests or pushed_digests[path].md5 != md5
+    ]:
+        err_msg = f"Integrity check failed for pushed files: {corrupted}"
+        raise DeviceConnectionError(err_msg)
+    _LOGGER.debug("Pushed %d of %d files", len(pending), len(files))
+    return list(pending)
+
+
+def _local_destination(local_dir: Path, remote_path: str) -> Path:
+    """Return the local path of a pulled device file.
+
+    :param local_dir: local destination directory
+    :type local_dir: Path
+    :param remote_path: absolute device path
+    :type remote_path: str
+    :raises ValueError: if the path escapes the destination directory
+    :return: local file path, mirroring the device path
+    :rtype: Path
+    """
+    destination = (local_dir / remote_path.lstrip("/")).resolve()
+    if not destination.is_relative_to(local_dir.resolve()):
+        err_msg = f"Refusing to pull {remote_path} outside of {local_dir}"
+        raise ValueError(err_msg)
+    return destination
+
+
+def pull_files(
+    hardware: OpenWRTHW,
+    remote_paths: Iterable[str],
+    local_dir: str | Path,
+    compress: bool = True,
+) -> list[Path]:
+    """Pull device files into a local directory in a single tar stream.
+
+    Files are written under ``local_dir`` with their full device path, e.g.
+    ``/tmp/log/messages`` is pulled to ``<local_dir>/tmp/log/messages``.
+    Files which changed on the device after the manifest, e.g. growing logs,
+    are still pulled and kept; their MD5 mismatches are reported once the
+    whole stream has been read. The files to be pulled are given to tar on
+    its standard input, so their number is not bound by the command line.
+
+    :param hardware: OpenWRT hardware instance
+    :type hardware: OpenWRTHW
+    :param remote_paths: absolute device files or directories
+    :type remote_paths: Iterable[str]
+    :param local_dir: local destination directory, created if needed
+    :type local_dir: str | Path
+    :param compress: gzip the stream, defaults to True
+    :type compress: bool
+    :raises DeviceConnectionError: if pulled files do not match the manifest
+        or are missing from the archive
+    :return: local paths of the pulled files, up to date ones excluded
+    :rtype: list[Path]
+    """
+    local_dir = Path(local_dir)
+    remote_digests = get_remote_digests(hardware, remote_paths)
+    pending = {
+        remote_path: digest
+        for remote_path, digest in remote_digests.items()
+        if not _is_up_to_date(_local_destination(local_dir, remote_path), digest)
+    }
+    if not pending:
+        return []
+    flag = "z" if compress else ""
+    channel = hardware.open_ssh_channel(
+        f"tar -c{flag}f - -C / -T -",
+        with_stdin=True,
+    )
+    # written concurrently, tar may stream the archive before reading all names
+    writer = threading.Thread(
+        target=_write_names,
+        args=(channel.stdin, [path.lstrip("/") for path in pending]),
+        name="tar-names",
+        daemon=True,
+    )
+    writer.start()
+    pulled = []
+    mismatched = []
+    try:
+        with (
+            tarfile.open(fileobj=channel.stdout, mode="r|gz")
+            if compress
+            else tarfile.open(fileobj=channel.stdout, mode="r|")
+        ) as tar:
+            for member in tar:
+                remote_path = "/" + member.name.removeprefix("./")
+                if not member.isfile() or remote_path not in pending:
+                    continue
+                destination = _local_destination(local_dir, remote_path)
+                destination.parent.mkdir(parents=True, exist_ok=True)
+                reader = _HashingReader(tar.extractfile(member))
+                with destination.open("wb") as local_file:
+                    while chunk := reader.read(_CHUNK_SIZE):
+                        local_file.write(chunk)
+                os.utime(destination, (member.mtime, member.mtime))
+                if reader.md5.hexdigest() != pending[remote_path].md5:
+                    mismatched.append(remote_path)
+                pulled.append(destination)
+        writer.join()
+        channel.wait()
+    finally:
+        channel.close()
+    errors = []
+    if mismatched:
+        errors.append(f"Integrity check failed for pulled files: {mismatched}")
+    if missing := set(pending) - {
+        "/" + path.relative_to(local_dir.resolve()).as_posix() for path in pulled
+    }:
+        errors.append(f"Files missing from the pulled archive: {sorted(missing)}")
+    if errors:
+        err_msg = "; ".join(errors)
+        raise DeviceConnectionError(err_msg)
+    return pulled
@@ -0,0 +1,214 @@
+"""Background follower of the OpenWRT system log."""
+
+from __future__ import annotations
+
+import bisect
+import re
+import shlex
+import time
+from typing import IO, TYPE_CHECKING
+
+from boardfarm3_openwrt.lib.channel_reader import ChannelReader
+from boardfarm3_openwrt.lib.records import LogEntry
+
+if TYPE_CHECKING:
+    from boardfarm3_openwrt.templates.openwrt.openwrt_hw import OpenWRTHW
+
+# syslog levels, most severe first
+_LOG_LEVELS = ("emerg", "alert", "crit", "err", "warn", "notice", "info", "debug")
+# POSIX ERE metacharacters and the awk regex delimiter, re.escape also escapes
+# characters such as "-" for which a backslash is undefined in ERE
+_ERE_SPECIAL = re.compile(r"([.\[\]()*+?{}|^$\\/])")
+
+
+def build_logread_command(
+    daemons: list[str] | None = None,
+    level: str | None = None,
+) -> str:
+    """Build the ``logread -f`` command filtering entries on the device.
+
+    Entries are printed with their epoch timestamp (``-t``). The filter runs
+    in awk, which flushes every matching line, so filtered entries are not
+    held back by pipe buffering.
+
+    :param daemons: only keep entries of these daemons, defaults to None (all)
+    :type daemons: list[str] | None
+    :param level: only keep entries of this level or more severe,
+        defaults to None (all)
+    :type level: str | None
+    :raises ValueError: on unknown log level
+    :return: logread command line
+    :rtype: str
+    """
+    conditions = []
+    if level is not None:
+        if level not in _LOG_LEVELS:
+            err_msg = f"Unknown log level {level!r}, expected one of {_LOG_LEVELS}"
+            raise ValueError(err_msg)
+        levels = "|".join(_LOG_LEVELS[: _LOG_LEVELS.index(level) + 1])
+        conditions.append(f"/ [a-z0-9]+\\.({levels}) /")
+    if daemons:
+        names = "|".join(_ERE_SPECIAL.sub(r"\\\1", daemon) for daemon in daemons)
+        conditions.append(f"/ ({names})(\\[[0-9]+\\])?: /")
+    if not conditions:
+        return "logread -f -t"
+    awk_program = f"{' && '.join(conditions)} {{ print; fflush() }}"
+    return f"logread -f -t | awk {shlex.quote(awk_program)}"
+
+
+class LogFollower(ChannelReader):
+    """Follow ``logread -f`` on a dedicated SSH channel.
+
+    Entries are kept in a bounded buffer ordered by arrival and indexed by
+    their timestamp. Waiters are woken up on each new entry instead of
+    re-reading the log buffer of the device.
+
+    ``logread -f`` replays the device log buffer first, so waits only
+    consider the entries arriving after a :meth:`mark`, by default the one
+    taken when the wait starts:
+
+    .. code-block:: python
+
+        mark = follower.mark()
+        board.sw.restart_service("dnsmasq")
+        follower.wait_for_log("started, version", timeout=30, since_mark=mark)
+    """
+
+    def __init__(
+        self,
+        hardware: OpenWRTHW,
+        daemons: list[str] | None = None,
+        level: str | None = None,
+        max_entries: int = 10000,
+    ) -> None:
+        """Initialize the log follower.
+
+        :param hardware: OpenWRT hardware instance
+        :type hardware: OpenWRTHW
+        :param daemons: only keep entries of these daemons, defaults to None
+        :type daemons: list[str] | None
+        :param level: only keep entries of this level or more severe,
+            defaults to None
+        :type level: str | None
+        :param max_entries: buffer size, oldest entries are dropped first,
+            defaults to 10000
+        :type max_entries: int
+        """
+        super().__init__(hardware)
+        self._command = build_logread_command(daemons, level)
+        self._max_entries = max_entries
+        self._entries: list[LogEntry] = []
+        self._timestamps: list[float] = []
+        # sequence number of self._entries[0]
+        self._first_seq = 0
+
+    def start(self) -> LogFollower:
+        """Start following the device log.
+
+        :return: the started follower
+        :rtype: LogFollower
+        """
+        self._open_channel(self._command)
+        self._start_reader("logread")
+        return self
+
+    def _consume(self, stream: IO[bytes]) -> None:
+        """Parse log lines from the channel into the buffer.
+
+        :param stream: logread output
+        :type stream: IO[bytes]
+        """
+        for raw_line in stream:
+            entry = LogEntry.from_logread(raw_line.decode(errors="replace"))
+            if entry is not None:
+                self._append(entry)
+
+    def _append(self, entry: LogEntry) -> None:
+        """Add an entry to the buffer and wake up the waiters.
+
+        :param entry: new log entry
+        :type entry: LogEntry
+        """
+        with self._condition:
+            self._entries.append(entry)
+            self._timestamps.append(entry.timestamp)
+            # trim in chunks to keep the appends amortized O(1)
+            if len(self._entries) > self._max_entries * 5 // 4:
+                drop = len(self._entries) - self._max_entries
+                del self._entries[:drop]
+                del self._timestamps[:drop]
+                self._first_seq += drop
+            self._condition.notify_all()
+
+    def get_entries(
+        self,
+        since: float | None = None,
+        until: float | None = None,
+    ) -> list[LogEntry]:
+        """Return the buffered entries within a time range.
+
+        :param since: epoch timestamp of the oldest entry, defaults to None
+        :type since: float | None
+        :param until: epoch timestamp of the newest entry, defaults to None
+        :type until: float | None
+        :return: log entries in arrival order
+        :rtype: list[LogEntry]
+        """
+        with self._condition:
+            start = 0 if since is None else bisect.bisect_left(self._timestamps, since)
+            end = (
+                len(self._timestamps)
+                if until is None
+                else bisect.bisect_right(self._timestamps, until)
+            )
+            return self._entries[start:end]
+
+    def mark(self) -> int:
+        """Return a marker of the current end of the buffer.
+
+        :return: sequence number of the next entry to arrive
+        :rtype: int
+        """
+        with self._condition:
+            return self._first_seq + len(self._entries)
+
+    def wait_for_log(
+        self,
+        pattern: str,
+        timeout: float,
+        since_mark: int | None = None,
+    ) -> LogEntry:
+        """Wait for a log entry whose message matches a pattern.
+
+        Buffered entries which arrived after ``since_mark`` are checked
+        first, then the call blocks on new entries as they are streamed from
+        the device.
+
+        :param pattern: regular expression searched in the entry message
+        :type pattern: str
+        :param timeout: seconds to wait
+        :type timeout: float
+        :param since_mark: :meth:`mark` the entries must arrive after,
+            defaults to None (entries arriving after the call)
+        :type since_mark: int | None
+        :raises TimeoutError: if no matching entry was logged in time
+        :return: first matching log entry
+        :rtype: LogEntry
+        """
+        regex = re.compile(pattern)
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            next_seq = self.mark() if since_mark is None else since_mark
+            while True:
+                # entries may have been trimmed while waiting
+                offset = max(next_seq - self._first_seq, 0)
+                for entry in self._entries[offset:]:
+                    if regex.search(entry.message):
+                        return entry
+                next_seq = self._first_seq + len(self._entries)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._running:
+                    break
+                self._condition.wait(remaining)
+        err_msg = f"No log entry matching {pattern!r} within {timeout}s"
+        raise TimeoutError(err_msg)
@@ -0,0 +1,351 @@
+"""NAT connection-setup rate benchmark.
+
+LAN clients open new flows towards a WAN endpoint with ``hping3``, every
+probe using a new source port so that each one creates a new conntrack/NAT
+entry on the DUT. The offered rate is raised step by step until the share of
+flows without a reply crosses the failure threshold. The DUT conntrack table
+size and CPU load are sampled for every step.
+
+Source ports must not wrap within a step, so the probe count of a client is
+capped to the source port range and high rate steps are shortened instead;
+between steps the DUT conntrack table is left to drain back to its initial
+size, so ports reused by the next step do not hit live entries.
+
+A TCP flow is established when the SYN gets an answer through the NAT. UDP
+probes only get ICMP port unreachable answers, which the WAN host rate limits
+per destination (about 1/s), and all the flows share the DUT WAN address once
+NATed; a UDP flow is therefore established when the DUT holds a conntrack
+entry for it at the end of the step. UDP steps must end before the unreplied
+UDP conntrack timeout (30s by default).
+
+The harness only needs consoles with an ``execute_command`` method, so it
+runs unchanged against boardfarm devices or the
+:class:`~boardfarm3_openwrt.lib.netns.NetnsTopology` stand-ins::
+
+    with NetnsTopology(lan_clients=2) as topology:
+        result = NatConnectionBenchmark(
+            topology.lan_consoles, topology.dut_console, topology.wan_ip
+        ).run()
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Protocol
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+_LOGGER = logging.getLogger(__name__)
+_HPING_STATS = re.compile(r"(\d+) packets transmitted, (\d+) packets received")
+_BASE_PORT = 1024
+# probes of a client per step, one source port each from _BASE_PORT
+_MAX_PROBES = 65536 - _BASE_PORT
+# conntrack entries tolerated above the initial count once drained
+_DRAIN_SLACK = 16
+
+
+class CommandConsole(Protocol):
+    """Console interface used by the benchmark."""
+
+    def execute_command(self, command: str, timeout: int = -1) -> str:
+        """Execute a command and return its output.
+
+        :param command: command to be executed
+        :param timeout: seconds to wait for the command
+        """
+
+
+@dataclass(frozen=True)
+class RateStep:
+    """Measurements of a single offered rate step."""
+
+    offered_rate: int
+    attempted: int
+    established: int
+    elapsed: float
+    conntrack_count: int
+    conntrack_max: int
+    cpu_percent: float
+
+    @property
+    def failure_ratio(self) -> float:
+        """Share of attempted flows that got no reply.
+
+        :return: failure ratio between 0 and 1
+        :rtype: float
+        """
+        if not self.attempted:
+            return 1.0
+        return 1 - self.established / self.attempted
+
+    @property
+    def connection_rate(self) -> float:
+        """Achieved new connections per second.
+
+        :return: established connections per second
+        :rtype: float
+        """
+        return self.established / self.elapsed if self.elapsed else 0.0
+
+
+@dataclass
+class NatBenchmarkResult:
+    """Result of a NAT connection-setup rate benchmark."""
+
+    protocol: str
+    failure_threshold: float
+    steps: list[RateStep] = field(default_factory=list)
+
+    @property
+    def passing_steps(self) -> list[RateStep]:
+        """Steps whose failure ratio stayed within the threshold.
+
+        :return: passing steps
+        :rtype: list[RateStep]
+        """
+        return [
+            step for step in self.steps if step.failure_ratio <= self.failure_threshold
+        ]
+
+    @property
+    def max_connection_rate(self) -> float:
+        """Connections per second ceiling of the DUT.
+
+        :return: highest achieved rate of a passing step, 0 if none passed
+        :rtype: float
+        """
+        return max((step.connection_rate for step in self.passing_steps), default=0.0)
+
+
+class NatConnectionBenchmark:
+    """Raise the new flow rate through the DUT until NAT setup fails."""
+
+    def __init__(  # noqa: PLR0913
+        self,
+        lan_consoles: Sequence[CommandConsole],
+        dut_console: CommandConsole,
+        wan_ip: str,
+        protocol: str = "tcp",
+        dst_port: int = 80,
+        start_rate: int = 100,
+        rate_multiplier: float = 2.0,
+        max_rate: int = 100_000,
+        step_duration: int = 10,
+        failure_threshold: float = 0.01,
+        drain_timeout: int = 180,
+    ) -> None:
+        """Initialize the NAT benchmark.
+
+        :param lan_consoles: consoles of the LAN clients generating flows
+        :type lan_consoles: Sequence[CommandConsole]
+        :param dut_console: console of the device under test
+        :type dut_console: CommandConsole
+        :param wan_ip: IPv4 address of the WAN endpoint
+        :type wan_ip: str
+        :param protocol: tcp or udp, defaults to "tcp"
+        :type protocol: str
+        :param dst_port: destination port on the WAN endpoint, defaults to 80
+        :type dst_port: int
+        :param start_rate: first offered rate in flows/s, defaults to 100
+        :type start_rate: int
+        :param rate_multiplier: rate growth between steps, defaults to 2.0
+        :type rate_multiplier: float
+        :param max_rate: highest offered rate in flows/s, defaults to 100000
+        :type max_rate: int
+        :param step_duration: seconds each step lasts, defaults to 10
+        :type step_duration: int
+        :param failure_threshold: tolerated share of failed flows,
+            defaults to 0.01
+        :type failure_threshold: float
+        :param drain_timeout: seconds to wait between steps for the conntrack
+            entries of the previous step to expire, defaults to 180
+        :type drain_timeout: int
+        :raises ValueError: on unsupported protocol or invalid rates
+        """
+        if protocol not in ("tcp", "udp"):
+            err_msg = f"Unsupported protocol {protocol!r}, expected tcp or udp"
+            raise ValueError(err_msg)
+        if not lan_consoles or start_rate <= 0 or rate_multiplier <= 1:
+            err_msg = "At least one LAN client, a positive start rate and a rate "
+            err_msg += "multiplier greater than 1 are required"
+            raise ValueError(err_msg)
+        self._lan_consoles = list(lan_consoles)
+        self._dut_console = dut_console
+        self._wan_ip = wan_ip
+        self._protocol = protocol
+        self._dst_port = dst_port
+        self._start_rate = start_rate
+        self._rate_multiplier = rate_multiplier
+        self._max_rate = max_rate
+        self._step_duration = step_duration
+        self._failure_threshold = failure_threshold
+        self._drain_timeout = drain_timeout
+
+    def _hping_command(self, rate: int) -> str:
+        """Build the hping3 command offering the given rate from one client.
+
+        Each probe uses the next source port from ``_BASE_PORT``, the probe
+        count is capped so the ports never wrap.
+
+        :param rate: flows per second from this client
+        :type rate: int
+        :return: hping3 command line
+        :rtype: str
+        """
+        mode = "-S" if self._protocol == "tcp" else "--udp"
+        interval = max(1, 1_000_000 // rate)
+        count = min(rate * self._step_duration, _MAX_PROBES)
+        return (
+            f"hping3 {mode} -p {self._dst_port} -i u{interval} -c {count} "
+            f"--baseport {_BASE_PORT} {self._wan_ip} 2>&1 | tail -n 3"
+        )
+
+    def _run_client(self, console: CommandConsole, rate: int) -> tuple[int, int]:
+        """Offer flows from one LAN client and count the replies.
+
+        Replies are only meaningful for TCP, see the module documentation.
+
+        :param console: LAN client console
+        :type console: CommandConsole
+        :param rate: flows per second from this client
+        :type rate: int
+        :raises ValueError: if the hping3 statistics are missing
+        :return: attempted and established flow count
+        :rtype: tuple[int, int]
+        """
+        output = console.execute_command(
+            self._hping_command(rate),
+            timeout=self._step_duration * 3 + 30,
+        )
+        if match := _HPING_STATS.search(output):
+            return int(match.group(1)), int(match.group(2))
+        err_msg = f"Failed to parse hping3 statistics: {output}"
+        raise ValueError(err_msg)
+
+    def _read_cpu_times(self) -> tuple[int, int]:
+        """Read busy and total CPU jiffies of the DUT.
+
+        :return: busy and total jiffies
+        :rtype: tuple[int, int]
+        """
+        output = self._dut_console.execute_command("head -n 1 /proc/stat")
+        times = [int(value) for value in output.split("cpu", 1)[-1].split()[:8]]
+        idle = times[3] + times[4]
+        return sum(times) - idle, sum(times)
+
+    def _read_conntrack(self) -> tuple[int, int]:
+        """Read the DUT conntrack table size and limit.
+
+        :return: conntrack entry count and maximum
+        :rtype: tuple[int, int]
+        """
+        output = self._dut_console.execute_command(
+            "cat /proc/sys/net/netfilter/nf_conntrack_count"
+            " /proc/sys/net/netfilter/nf_conntrack_max",
+        )
+        count, maximum = (int(value) for value in output.split()[-2:])
+        return count, maximum
+
+    def _count_udp_flows(self) -> int:
+        """Count the DUT conntrack entries of the benchmark UDP flows.
+
+        :return: conntrack entries towards the WAN endpoint port
+        :rtype: int
+        """
+        output = self._dut_console.execute_command(
+            "{ cat /proc/net/nf_conntrack 2>/dev/null || conntrack -L 2>/dev/null; }"
+            f" | grep -c ' dst={self._wan_ip} sport=[0-9]* dport={self._dst_port} '",
+        )
+        return int(output.split()[-1])
+
+    def _wait_for_conntrack_drain(self, initial_count: int) -> None:
+        """Wait for the DUT conntrack table to drain back to its initial size.
+
+        :param initial_count: conntrack entry count before the first step
+        :type initial_count: int
+        """
+        deadline = time.monotonic() + self._drain_timeout
+        while (count := self._read_conntrack()[0]) > initial_count + _DRAIN_SLACK:
+            if time.monotonic() > deadline:
+                _LOGGER.warning(
+                    "DUT conntrack table still holds %d entries, %d expected",
+                    count,
+                    initial_count,
+                )
+                return
+            time.sleep(1)
+
+    def run_step(self, rate: int) -> RateStep:
+        """Offer the given total rate, split evenly across the LAN clients.
+
+        :param rate: total offered flows per second
+        :type rate: int
+        :return: measurements of the step
+        :rtype: RateStep
+        """
+        client_rate = max(1, rate // len(self._lan_consoles))
+        busy_start, total_start = self._read_cpu_times()
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=len(self._lan_consoles)) as executor:
+            results = list(
+                executor.map(
+                    lambda console: self._run_client(console, client_rate),
+                    self._lan_consoles,
+                ),
+            )
+        elapsed = time.monotonic() - start
+        busy_end, total_end = self._read_cpu_times()
+        conntrack_count, conntrack_max = self._read_conntrack()
+        total_delta = total_end - total_start
+        attempted = sum(result[0] for result in results)
+        if self._protocol == "udp":
+            established = min(self._count_udp_flows(), attempted)
+        else:
+            established = sum(result[1] for result in results)
+        step = RateStep(
+            offered_rate=client_rate * len(self._lan_consoles),
+            attempted=attempted,
+            established=established,
+            elapsed=elapsed,
+            conntrack_count=conntrack_count,
+            conntrack_max=conntrack_max,
+            cpu_percent=(
+                100 * (busy_end - busy_start) / total_delta if total_delta else 0.0
+            ),
+        )
+        _LOGGER.info(
+            "NAT %s step %d flows/s: %.0f conn/s, %.2f%% failed, "
+            "conntrack %d/%d, cpu %.1f%%",
+            self._protocol,
+            step.offered_rate,
+            step.connection_rate,
+            step.failure_ratio * 100,
+            step.conntrack_count,
+            step.conntrack_max,
+            step.cpu_percent,
+        )
+        return step
+
+    def run(self) -> NatBenchmarkResult:
+        """Raise the offered rate until the failure threshold is crossed.
+
+        :return: measurements of all the steps
+        :rtype: NatBenchmarkResult
+        """
+        result = NatBenchmarkResult(self._protocol, self._failure_threshold)
+        initial_count = self._read_conntrack()[0]
+        rate = self._start_rate
+        while rate <= self._max_rate:
+            if result.steps:
+                self._wait_for_conntrack_drain(initial_count)
+            step = self.run_step(rate)
+            result.steps.append(step)
+            if step.failure_ratio > self._failure_threshold:
+                break
+            rate = int(rate * self._rate_multiplier)
+        return result
@@ -0,0 +1,200 @@
+"""Local network namespace stand-ins for the LAN/DUT/WAN testbed.
+
+The topology mimics the OpenWRT board as seen by the use cases: a DUT
+namespace with a ``br-lan`` bridge towards the LAN client namespaces and a
+``br-wan`` interface towards the WAN namespace, forwarding and masquerading
+like the board does. It needs root, iproute2 and iptables on the local host.
+"""
+
+from __future__ import annotations
+
+import logging
+import subprocess
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from types import TracebackType
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class NetnsConsole:
+    """Minimal console executing commands inside a network namespace.
+
+    Implements the ``execute_command`` subset of ``BoardfarmPexpect`` that the
+    benchmark and use case code relies on.
+    """
+
+    def __init__(self, namespace: str) -> None:
+        """Initialize the namespace console.
+
+        :param namespace: network namespace name
+        :type namespace: str
+        """
+        self.namespace = namespace
+
+    def execute_command(self, command: str, timeout: int = -1) -> str:
+        """Execute a shell command inside the namespace.
+
+        :param command: shell command
+        :type command: str
+        :param timeout: seconds to wait, defaults to -1 (forever)
+        :type timeout: int
+        :return: combined stdout and stderr of the command
+        :rtype: str
+        """
+        result = subprocess.run(  # noqa: S603
+            ["ip", "netns", "exec", self.namespace, "sh", "-c", command],  # noqa: S607
+            capture_output=True,
+            text=True,
+            timeout=None if timeout < 0 else timeout,
+            check=False,
+        )
+        return result.stdout + result.stderr
+
+
+class NetnsTopology:
+    """LAN clients, DUT and WAN endpoint built from network namespaces."""
+
+    lan_network = "192.168.0"
+    wan_network = "10.64.0"
+
+    def __init__(self, lan_clients: int = 1, prefix: str = "bf") -> None:
+        """Initialize the topology, nothing is created before :meth:`setup`.
+
+        :param lan_clients: number of LAN client namespaces, defaults to 1
+        :type lan_clients: int
+        :param prefix: namespace name prefix, defaults to "bf"
+        :type prefix: str
+        """
+        self._prefix = prefix
+        self._lan_namespaces = [f"{prefix}-lan{idx}" for idx in range(lan_clients)]
+        self._dut_namespace = f"{prefix}-dut"
+        self._wan_namespace = f"{prefix}-wan"
+
+    @property
+    def lan_consoles(self) -> list[NetnsConsole]:
+        """Consoles of the LAN client namespaces.
+
+        :return: LAN client consoles
+        :rtype: list[NetnsConsole]
+        """
+        return [NetnsConsole(namespace) for namespace in self._lan_namespaces]
+
+    @property
+    def dut_console(self) -> NetnsConsole:
+        """Console of the DUT namespace.
+
+        :return: DUT console
+        :rtype: NetnsConsole
+        """
+        return NetnsConsole(self._dut_namespace)
+
+    @property
+    def wan_console(self) -> NetnsConsole:
+        """Console of the WAN namespace.
+
+        :return: WAN console
+        :rtype: NetnsConsole
+        """
+        return NetnsConsole(self._wan_namespace)
+
+    @property
+    def wan_ip(self) -> str:
+        """IPv4 address of the WAN endpoint.
+
+        :return: WAN endpoint IPv4 address
+        :rtype: str
+        """
+        return f"{self.wan_network}.2"
+
+    @staticmethod
+    def _run(command: str, namespace: str | None = None) -> None:
+        """Run a host command, optionally inside a namespace, raising on failure.
+
+        :param command: command line, split on whitespace
+        :type command: str
+        :param namespace: namespace to run the command in, defaults to None
+        :type namespace: str | None
+        """
+        if namespace is not None:
+            command = f"ip netns exec {namespace} {command}"
+        _LOGGER.debug("netns: %s", command)
+        subprocess.run(command.split(), check=True, capture_output=True)  # noqa: S603
+
+    def setup(self) -> NetnsTopology:
+        """Create the namespaces, links, addresses and NAT rule.
+
+        :return: the created topology
+        :rtype: NetnsTopology
+        """
+        dut, wan = self._dut_namespace, self._wan_namespace
+        for namespace in (*self._lan_namespaces, dut, wan):
+            self._run(f"ip netns add {namespace}")
+            self._run("ip link set lo up", namespace)
+        self._run("ip link add br-lan type bridge", dut)
+        self._run(f"ip addr add {self.lan_network}.1/24 dev br-lan", dut)
+        self._run("ip link set br-lan up", dut)
+        for idx, namespace in enumerate(self._lan_namespaces):
+            port = f"{self._prefix}-lp{idx}"
+            self._run(
+                f"ip link add eth1 netns {namespace} type veth peer name {port} "
+                f"netns {dut}",
+            )
+            self._run(f"ip link set {port} master br-lan up", dut)
+            lan_ip = f"{self.lan_network}.{idx + 10}"
+            self._run(f"ip addr add {lan_ip}/24 dev eth1", namespace)
+            self._run("ip link set eth1 up", namespace)
+            self._run(f"ip route add default via {self.lan_network}.1", namespace)
+        self._run(
+            f"ip link add br-wan netns {dut} type veth peer name eth1 netns {wan}",
+        )
+        self._run(f"ip addr add {self.wan_network}.1/24 dev br-wan", dut)
+        self._run("ip link set br-wan up", dut)
+        self._run(f"ip addr add {self.wan_ip}/24 dev eth1", wan)
+        self._run("ip link set eth1 up", wan)
+        self._run("sysctl -qw net.ipv4.ip_forward=1", dut)
+        self._run("iptables -t nat -A POSTROUTING -o br-wan -j MASQUERADE", dut)
+        return self
+
+    def teardown(self) -> None:
+        """Delete the namespaces, which also removes their links."""
+        for namespace in (
+            *self._lan_namespaces,
+            self._dut_namespace,
+            self._wan_namespace,
+        ):
+            subprocess.run(  # noqa: S603
+                ["ip", "netns", "del", namespace],  # noqa: S607
+                check=False,
+                capture_output=True,
+            )
+
+    def __enter__(self) -> NetnsTopology:
+        """Create the topology on entering the context.
+
+        :return: the created topology
+        :rtype: NetnsTopology
+        """
+        try:
+            return self.setup()
+        except subprocess.CalledProcessError:
+            self.teardown()
+            raise
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Delete the topology on leaving the context.
+
+        :param exc_type: exception type
+        :type exc_type: type[BaseException] | None
+        :param exc_value: exception instance
+        :type exc_value: BaseException | None
+        :param traceback: traceback
+        :type traceback: TracebackType | None
+        """
+        self.teardown()
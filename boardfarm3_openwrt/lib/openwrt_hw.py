@@ -2,19 +2,26 @@
 
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Any
+from typing import TYPE_CHECKING, Any, cast
 
 from boardfarm3.lib.connection_factory import connection_factory
 
+from boardfarm3_openwrt.lib import file_transfer
+from boardfarm3_openwrt.lib.console_recorder import RecordingConsole, ReplayConsole
+from boardfarm3_openwrt.lib.ssh_channel import SSHChannel
 from boardfarm3_openwrt.templates.openwrt.openwrt_hw import (
     OpenWRTHW as OpenWRTHWTemplate,
 )
 
 if TYPE_CHECKING:
     from argparse import Namespace
+    from collections.abc import Iterable
+    from pathlib import Path
 
     from boardfarm3.lib.boardfarm_pexpect import BoardfarmPexpect
 
+    from boardfarm3_openwrt.lib.console_recorder import Console
+
 
 class OpenWRTHW(OpenWRTHWTemplate):
     """OpenWRT hardware implementation."""
@@ -29,7 +36,7 @@ class OpenWRTHW(OpenWRTHWTemplate):
         """
         self._config = config
         self._cmdline_args = cmdline_args
-        self._console: BoardfarmPexpect | None = None
+        self._console: Console | None = None
         self._shell_prompt: list[str] = [r"root@OpenWrt:~#"]
 
     @property
@@ -41,15 +48,24 @@ class OpenWRTHW(OpenWRTHWTemplate):
         """
         return self._config
 
-    def _connect_to_serial_console(self, device_name: str) -> BoardfarmPexpect:
+    def _connect_to_serial_console(self, device_name: str) -> Console:
         """Establish connection to serial console.
 
+        A ``replay`` connection type answers from the ``console_replay_file``
+        recording instead of a device, and a ``console_record_file`` records
+        the session of any other connection type.
+
         :param device_name: device name
         :type device_name: str
         :return: serial console instance
-        :rtype: BoardfarmPexpect
+        :rtype: Console
         """
-        return connection_factory(
+        if self._config.get("connection_type") == "replay":
+            return ReplayConsole(
+                self._config["console_replay_file"],
+                realtime=self._config.get("console_replay_realtime", False),
+            )
+        console = connection_factory(
             self._config.get("connection_type"),
             f"{device_name}.console",
             username=self._username,
@@ -59,6 +75,9 @@ class OpenWRTHW(OpenWRTHWTemplate):
             shell_prompt=self._shell_prompt,
             save_console_logs=self._cmdline_args.save_console_logs,
         )
+        if recording_file := self._config.get("console_record_file"):
+            return RecordingConsole(console, recording_file)
+        return console
 
     @property
     def _ipaddr(self) -> str:
@@ -131,15 +150,88 @@ class OpenWRTHW(OpenWRTHWTemplate):
     def get_interactive_consoles(self) -> dict[str, BoardfarmPexpect]:
         """Get interactive consoles of the device.
 
+        A replayed console only implements the :class:`Console` API.
+
         :return: device interactive consoles
         :rtype: dict[str, BoardfarmPexpect]
         """
-        return {"console": self._console}
+        return {"console": self.get_console()}
 
     def get_console(self) -> BoardfarmPexpect:
         """Return console instance.
 
+        A replayed console only implements the :class:`Console` API.
+
         :return: console instance
         :rtype: BoardfarmPexpect
         """
-        return self._console
+        return cast("BoardfarmPexpect", self._console)
+
+    def open_ssh_channel(self, command: str, with_stdin: bool = False) -> SSHChannel:
+        """Start a command on a dedicated SSH channel.
+
+        The channel is independent of the interactive console, so its output
+        is a raw byte stream and can be consumed while the console is in use.
+
+        :param command: command to be executed on the device
+        :type command: str
+        :param with_stdin: open a pipe to the command stdin, defaults to False
+        :type with_stdin: bool
+        :return: started SSH channel
+        :rtype: SSHChannel
+        """
+        return SSHChannel(
+            command,
+            ipaddr=self._ipaddr,
+            port=self._port,
+            username=self._username,
+            password=self._password,
+            with_stdin=with_stdin,
+        ).start()
+
+    def push_files(
+        self,
+        local_paths: Iterable[str | Path],
+        remote_dir: str,
+        compress: bool = True,
+    ) -> list[str]:
+        """Push local files and directories onto the device.
+
+        The files are streamed as one tar over a dedicated SSH channel, files
+        already up to date on the device are skipped and each pushed file is
+        checked against its MD5 on the device.
+
+        :param local_paths: local files or directories
+        :type local_paths: Iterable[str | Path]
+        :param remote_dir: absolute device directory, created if needed
+        :type remote_dir: str
+        :param compress: gzip the stream, defaults to True
+        :type compress: bool
+        :return: device paths of the pushed files
+        :rtype: list[str]
+        """
+        return file_transfer.push_files(self, local_paths, remote_dir, compress)
+
+    def pull_files(
+        self,
+        remote_paths: Iterable[str],
+        local_dir: str | Path,
+        compress: bool = True,
+    ) -> list[Path]:
+        """Pull device files and directories into a local directory.
+
+        The files are streamed as one tar over a dedicated SSH channel and
+        written under ``local_dir`` with their full device path. Local files
+        already up to date are skipped and each pulled file is checked
+        against its MD5 on the device.
+
+        :param remote_paths: absolute device files or directories
+        :type remote_paths: Iterable[str]
+        :param local_dir: local destination directory
+        :type local_dir: str | Path
+        :param compress: gzip the stream, defaults to True
+        :type compress: bool
+        :return: local paths of the pulled files
+        :rtype: list[Path]
+        """
+        return file_transfer.pull_files(self, remote_paths, local_dir, compress)
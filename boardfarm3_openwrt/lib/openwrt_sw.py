@@ -1,20 +1,38 @@
 """OpenWRT software module."""
 
-import re
-from ipaddress import IPv4Address, IPv4Network, IPv6Address, IPv6Interface
+from __future__ import annotations
+
+import shlex
+from ipaddress import IPv4Address, IPv4Network, IPv6Address
+from typing import TYPE_CHECKING, cast
 
-from boardfarm3.lib.boardfarm_pexpect import BoardfarmPexpect
 from boardfarm3.lib.networking import DNS, IptablesFirewall
 
-from boardfarm3_openwrt.lib.openwrt_hw import OpenWRTHW
+from boardfarm3_openwrt.lib.file_transfer import get_remote_digests
+from boardfarm3_openwrt.lib.log_follower import LogFollower
+from boardfarm3_openwrt.lib.records import Address, Interface, Lease, Route, Station
+from boardfarm3_openwrt.lib.snapshot import ConfigSnapshot, get_reload_commands
+from boardfarm3_openwrt.lib.table_watcher import ConntrackWatcher, RouteWatcher
 from boardfarm3_openwrt.templates.openwrt.openwrt_sw import (
     OpenWRTSW as OpenWRTSWTemplate,
 )
 
+if TYPE_CHECKING:
+    from ipaddress import IPv4Interface
+
+    from boardfarm3.lib.boardfarm_pexpect import BoardfarmPexpect
+
+    from boardfarm3_openwrt.lib.openwrt_hw import OpenWRTHW
+
+# uci stages uncommitted changes here, on top of /etc/config
+_UCI_STAGING_DIR = "/tmp/.uci"  # noqa: S108
+
 
 class OpenWRTSW(OpenWRTSWTemplate):
     """OpenWRT software."""
 
+    _SNAPSHOT_PATHS = ("/etc/config", _UCI_STAGING_DIR)
+
     def __init__(self, hardware: OpenWRTHW) -> None:
         """Initialise the OpenWRT software.
 
@@ -70,11 +88,8 @@ class OpenWRTSW(OpenWRTSWTemplate):
         :return: netmask of the interface
         :rtype: IPv4Address
         """
-        output = self._get_console("networking").execute_command(
-            f"ifconfig {interface}",
-        )
-        netmask = output.split("Mask:")[-1].split()[0]
-        return IPv4Address(netmask)
+        address = self._get_interface_ip_addresses(interface, version=4)[0]
+        return cast("IPv4Interface", address.interface).netmask
 
     @property
     def lan_network_ipv4(self) -> IPv4Network:
@@ -83,8 +98,8 @@ class OpenWRTSW(OpenWRTSWTemplate):
         :return: LAN IPv4 network.
         :rtype: IPv4Network
         """
-        lan_network_mask = self.get_interface_ipv4_netmask(self.lan_iface)
-        return IPv4Network(f"{self.lan_gateway_ipv4}/{lan_network_mask}", strict=False)
+        address = self._get_interface_ip_addresses(self.lan_iface, version=4)[0]
+        return cast("IPv4Interface", address.interface).network
 
     def _get_console(self, usage: str) -> BoardfarmPexpect:
         """Return console instance for the given usage.
@@ -118,37 +133,48 @@ class OpenWRTSW(OpenWRTSWTemplate):
         """
         return self._firewall
 
-    def _get_nw_interface_ip_address(
-        self,
-        interface_name: str,
-        is_ipv6: bool,
-    ) -> list[str]:
-        """Return network interface ip address.
+    def get_interface(self, interface: str) -> Interface:
+        """Return the link state and addresses of the given interface.
 
-        :param interface_name: interface name
-        :param is_ipv6: is ipv6 address
-        :returns: IP address list
+        :param interface: interface name
+        :type interface: str
+        :return: interface record
+        :rtype: Interface
         """
-        prefix = "inet6" if is_ipv6 else "inet"
-        ip_regex = prefix + r"\s(?:addr:)?\s*([^\s/]+)"
         output = self._get_console("networking").execute_command(
-            f"ifconfig {interface_name}",
+            f"ifconfig {interface}",
         )
-        return re.findall(ip_regex, output)
+        return Interface.from_ifconfig(interface, output)
+
+    def _get_interface_ip_addresses(
+        self,
+        interface: str,
+        version: int,
+    ) -> list[Address]:
+        """Return the addresses of the given IP version of an interface.
+
+        :param interface: interface name
+        :type interface: str
+        :param version: 4 or 6
+        :type version: int
+        :raises ValueError: If the interface has no address of that version
+        :return: address records
+        :rtype: list[Address]
+        """
+        if addresses := self.get_interface(interface).get_addresses(version):
+            return addresses
+        err_msg = f"Failed to get IPv{version} address of {interface} interface"
+        raise ValueError(err_msg)
 
     def get_interface_ipv4addr(self, interface: str) -> str:
         """Return given interface IPv4 address.
 
         :param interface: interface name
         :type interface: str
-        :raises ValueError: If failed to get the IPv4 address of the interface
         :return: IPv4 address
         :rtype: str
         """
-        if ips := self._get_nw_interface_ip_address(interface, is_ipv6=False):
-            return ips[0]
-        err_msg = f"Failed to get IPv4 address of {interface} interface"
-        raise ValueError(err_msg)
+        return str(self._get_interface_ip_addresses(interface, version=4)[0].ip)
 
     def _get_interface_ipv6_address(self, interface: str, address_type: str) -> str:
         """Return IPv6 address of the given network interface.
@@ -162,10 +188,9 @@ class OpenWRTSW(OpenWRTSWTemplate):
         :rtype: str
         """
         address_type = address_type.replace("-", "_")
-        ip_addresses = self._get_nw_interface_ip_address(interface, is_ipv6=True)
-        for ip_addr in ip_addresses:
-            if getattr(IPv6Interface(ip_addr), f"is_{address_type}"):
-                return ip_addr
+        for address in self._get_interface_ip_addresses(interface, version=6):
+            if getattr(address.interface, f"is_{address_type}"):
+                return str(address.ip)
         err_msg = f"Failed to get IPv6 address of {interface} {address_type} address"
         raise ValueError(err_msg)
 
@@ -180,11 +205,200 @@ class OpenWRTSW(OpenWRTSWTemplate):
     def get_interface_mac_addr(self, interface: str) -> str:
         """Return given interface mac address.
 
+        Point-to-point interfaces such as ``pppoe-wan`` have no hardware
+        address in ifconfig, their sysfs address is returned instead.
+
         :param interface: interface name
         :return: mac address of the given interface
         """
+        if (mac := self.get_interface(interface).mac) is not None:
+            return mac
         return (
             self._get_console("networking")
             .execute_command(f"cat /sys/class/net/{interface}/address")
             .strip()
         )
+
+    def get_routes(self, ipv6: bool = False) -> list[Route]:
+        """Return the main routing table.
+
+        :param ipv6: IPv6 routing table, defaults to False
+        :type ipv6: bool
+        :return: route records
+        :rtype: list[Route]
+        """
+        output = self._get_console("networking").execute_command(
+            f"ip {'-6' if ipv6 else '-4'} route show",
+        )
+        return Route.from_ip_route_output(output, ipv6=ipv6)
+
+    def get_dhcp_leases(self) -> list[Lease]:
+        """Return the DHCP leases handed out by dnsmasq.
+
+        :return: lease records
+        :rtype: list[Lease]
+        """
+        output = self._get_console("networking").execute_command(
+            "cat /tmp/dhcp.leases 2>/dev/null",
+        )
+        return [
+            Lease.from_dnsmasq(line) for line in output.splitlines() if line.strip()
+        ]
+
+    def get_wifi_stations(self, interface: str) -> list[Station]:
+        """Return the stations associated to a wireless interface.
+
+        :param interface: wireless interface name
+        :type interface: str
+        :return: station records
+        :rtype: list[Station]
+        """
+        output = self._get_console("wifi").execute_command(
+            f"iw dev {interface} station dump",
+        )
+        return Station.from_iw_station_dump(output)
+
+    def take_snapshot(self, paths: tuple[str, ...] | None = None) -> ConfigSnapshot:
+        """Take a snapshot of the device configuration.
+
+        The files are pulled as a single gzipped tar over a dedicated SSH
+        channel and kept in memory along with their MD5 digests. The default
+        paths hold the committed uci configuration and the uncommitted uci
+        changes staged under ``/tmp/.uci``. Paths missing on the device are
+        skipped.
+
+        :param paths: device paths to be saved, defaults to /etc/config and
+            /tmp/.uci
+        :type paths: tuple[str, ...] | None
+        :return: configuration snapshot
+        :rtype: ConfigSnapshot
+        """
+        paths = paths or self._SNAPSHOT_PATHS
+        relative_paths = " ".join(shlex.quote(path.lstrip("/")) for path in paths)
+        channel = self._hw.open_ssh_channel(
+            f'set --; for path in {relative_paths}; do [ -e "/$path" ] && '
+            'set -- "$@" "$path"; done; tar -czf - -C / "$@"',
+        )
+        try:
+            archive = channel.stdout.read()
+            channel.wait()
+        finally:
+            channel.close()
+        return ConfigSnapshot.from_archive(paths, archive)
+
+    def restore_snapshot(self, snapshot: ConfigSnapshot) -> list[str]:
+        """Restore the device configuration saved in a snapshot.
+
+        Only the files whose MD5 digest differs from the snapshot are pushed
+        back, files created since the snapshot are removed and only the
+        services owning the touched config files are reloaded. Staged uci
+        changes are restored along with the configuration when the snapshot
+        holds ``/tmp/.uci``; otherwise they are reverted, so a later
+        ``uci commit`` does not bring them back.
+
+        :param snapshot: snapshot returned by :meth:`take_snapshot`
+        :type snapshot: ConfigSnapshot
+        :return: device files that were restored or removed, reverted uci
+            changes included
+        :rtype: list[str]
+        """
+        current_digests = {
+            path: digest.md5
+            for path, digest in get_remote_digests(self._hw, snapshot.paths).items()
+        }
+        changed_files = snapshot.changed_files(current_digests)
+        added_files = snapshot.added_files(current_digests)
+        console = self._get_console("default_shell")
+        if changed_files:
+            channel = self._hw.open_ssh_channel("tar -xzf - -C /", with_stdin=True)
+            try:
+                channel.stdin.write(snapshot.build_archive(changed_files))
+                channel.wait()
+            finally:
+                channel.close()
+        if added_files:
+            console.execute_command(
+                "rm -f " + " ".join(shlex.quote(path) for path in added_files),
+            )
+        # uci readers apply staged changes on top of /etc/config
+        reverted_files = []
+        if _UCI_STAGING_DIR not in snapshot.paths:
+            reverted_files = self._revert_uci_changes()
+        touched_files = sorted(changed_files + added_files)
+        if reload_commands := get_reload_commands(touched_files):
+            console.execute_command("; ".join(reload_commands), timeout=120)
+        return touched_files + reverted_files
+
+    def _revert_uci_changes(self) -> list[str]:
+        """Revert the uncommitted uci changes of every config.
+
+        :return: reverted change files under /tmp/.uci
+        :rtype: list[str]
+        """
+        console = self._get_console("default_shell")
+        configs = console.execute_command(f"ls {_UCI_STAGING_DIR} 2>/dev/null").split()
+        if configs:
+            console.execute_command(
+                "; ".join(f"uci revert {shlex.quote(config)}" for config in configs),
+            )
+        return [f"{_UCI_STAGING_DIR}/{config}" for config in configs]
+
+    def start_log_follower(
+        self,
+        daemons: list[str] | None = None,
+        level: str | None = None,
+        max_entries: int = 10000,
+    ) -> LogFollower:
+        """Start following the system log in the background.
+
+        ``logread -f`` runs on a dedicated SSH channel, filtered on the device
+        by daemon and level, so the console stays free and waiting for an
+        event does not re-read the whole log buffer.
+
+        :param daemons: only keep entries of these daemons, defaults to None
+        :type daemons: list[str] | None
+        :param level: only keep entries of this level or more severe,
+            defaults to None
+        :type level: str | None
+        :param max_entries: number of entries kept in memory, defaults to 10000
+        :type max_entries: int
+        :return: started log follower, to be stopped by the caller
+        :rtype: LogFollower
+        """
+        return LogFollower(self._hw, daemons, level, max_entries).start()
+
+    def start_conntrack_watcher(
+        self,
+        timeout: float = 60,
+        subscribe_delay: float = 1,
+    ) -> ConntrackWatcher:
+        """Start mirroring the conntrack table from its events.
+
+        :param timeout: seconds to wait for the initial dump, defaults to 60
+        :type timeout: float
+        :param subscribe_delay: seconds given to the event subscriber before
+            the dump, events raised before it subscribed are missed, increase
+            it on slow devices, defaults to 1
+        :type subscribe_delay: float
+        :return: started conntrack watcher, to be stopped by the caller
+        :rtype: ConntrackWatcher
+        """
+        return ConntrackWatcher(self._hw, subscribe_delay).start(timeout)
+
+    def start_route_watcher(
+        self,
+        timeout: float = 60,
+        subscribe_delay: float = 1,
+    ) -> RouteWatcher:
+        """Start mirroring the routing and neighbour tables from their events.
+
+        :param timeout: seconds to wait for the initial dump, defaults to 60
+        :type timeout: float
+        :param subscribe_delay: seconds given to the event subscriber before
+            the dump, events raised before it subscribed are missed, increase
+            it on slow devices, defaults to 1
+        :type subscribe_delay: float
+        :return: started route watcher, to be stopped by the caller
+        :rtype: RouteWatcher
+        """
+        return RouteWatcher(self._hw, subscribe_delay).start(timeout)
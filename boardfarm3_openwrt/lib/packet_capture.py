@@ -0,0 +1,202 @@
+"""Streaming tcpdump capture on an OpenWRT device."""
+
+from __future__ import annotations
+
+import queue
+import shlex
+import time
+from typing import IO, TYPE_CHECKING
+
+from boardfarm3.exceptions import DeviceConnectionError
+
+from boardfarm3_openwrt.lib.channel_reader import ChannelReader
+from boardfarm3_openwrt.lib.pcap import PcapPacket, PcapStreamParser
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+    from pathlib import Path
+
+    from boardfarm3_openwrt.templates.openwrt.openwrt_hw import OpenWRTHW
+
+_READ_SIZE = 65536
+
+
+class PacketCapture(ChannelReader):
+    """Capture running tcpdump on the device, streamed back as pcap over SSH.
+
+    The BPF filter is applied by tcpdump on the device, so only matching
+    packets cross the wire. A reader thread drains the channel, optionally
+    writes the raw pcap to a local file and queues the parsed packets.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        hardware: OpenWRTHW,
+        interface: str,
+        bpf_filter: str = "",
+        packet_count: int | None = None,
+        snaplen: int = 0,
+        output_file: Path | None = None,
+    ) -> None:
+        """Initialize the packet capture.
+
+        :param hardware: OpenWRT hardware instance
+        :type hardware: OpenWRTHW
+        :param interface: interface to capture on
+        :type interface: str
+        :param bpf_filter: BPF filter expression, defaults to "" (everything)
+        :type bpf_filter: str
+        :param packet_count: stop after this many packets, defaults to None
+        :type packet_count: int | None
+        :param snaplen: bytes captured per packet, defaults to 0 (whole packet)
+        :type snaplen: int
+        :param output_file: local file receiving the raw pcap, defaults to None
+        :type output_file: Path | None
+        """
+        super().__init__(hardware)
+        self._interface = interface
+        self._bpf_filter = bpf_filter
+        self._packet_count = packet_count
+        self._snaplen = snaplen
+        self._output_file = output_file
+        self._parser = PcapStreamParser()
+        self._packets: queue.Queue[PcapPacket | None] = queue.Queue()
+        self._finished = False
+
+    @property
+    def command(self) -> str:
+        """Command line of tcpdump on the device.
+
+        :return: tcpdump command line
+        :rtype: str
+        """
+        command = (
+            f"tcpdump -i {shlex.quote(self._interface)} -U -w - -s {self._snaplen}"
+        )
+        if self._packet_count is not None:
+            command += f" -c {self._packet_count}"
+        if self._bpf_filter:
+            command += f" {shlex.quote(self._bpf_filter)}"
+        return command
+
+    def start(self, timeout: float = 30) -> PacketCapture:
+        """Start tcpdump on the device and the local reader thread.
+
+        Returns once tcpdump is listening, so no packet sent afterwards is
+        missed.
+
+        :param timeout: seconds to wait for tcpdump to listen, defaults to 30
+        :type timeout: float
+        :raises DeviceConnectionError: if tcpdump could not be started, e.g.
+            not installed, unknown interface or invalid filter
+        :return: the started capture
+        :rtype: PacketCapture
+        """
+        channel = self._open_channel(self.command)
+        if not channel.wait_for_stderr("listening on", timeout):
+            try:
+                if not channel.is_running:
+                    # raises with the tcpdump or ssh error message
+                    channel.wait()
+            finally:
+                channel.close()
+            err_msg = (
+                f"tcpdump did not start listening on {self._interface} within "
+                f"{timeout}s: {channel.stderr}"
+            )
+            raise DeviceConnectionError(err_msg)
+        self._start_reader(f"tcpdump-{self._interface}")
+        return self
+
+    def _consume(self, stream: IO[bytes]) -> None:
+        """Drain the channel until tcpdump exits or the capture is stopped.
+
+        :param stream: tcpdump pcap output
+        :type stream: IO[bytes]
+        """
+        pcap_file: IO[bytes] | None = None
+        try:
+            if self._output_file is not None:
+                pcap_file = self._output_file.open("wb")
+            while chunk := stream.read1(_READ_SIZE):  # type: ignore[attr-defined]
+                if pcap_file is not None:
+                    pcap_file.write(chunk)
+                for packet in self._parser.feed(chunk):
+                    self._packets.put(packet)
+        finally:
+            if pcap_file is not None:
+                pcap_file.close()
+            self._packets.put(None)
+
+    def _next_packet(self, timeout: float | None) -> PcapPacket | None:
+        """Return the next captured packet.
+
+        :param timeout: seconds to wait for the packet
+        :type timeout: float | None
+        :return: next packet, None if the capture ended or timed out
+        :rtype: PcapPacket | None
+        """
+        if self._finished:
+            return None
+        try:
+            packet = self._packets.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        if packet is None:
+            self._finished = True
+        return packet
+
+    def packets(self, timeout: float | None = None) -> Iterator[PcapPacket]:
+        """Yield captured packets as they arrive.
+
+        The generator ends when tcpdump exits (e.g. ``packet_count`` reached),
+        the capture is stopped, or no packet arrived for ``timeout`` seconds.
+
+        :param timeout: seconds to wait for the next packet, defaults to None
+        :type timeout: float | None
+        :yield: captured packets
+        """
+        while (packet := self._next_packet(timeout)) is not None:
+            yield packet
+
+    def stop(self) -> None:
+        """Stop tcpdump and wait for the reader thread to flush.
+
+        :raises DeviceConnectionError: if tcpdump had exited with an error
+        """
+        if self._channel is None:
+            return
+        exited = not self._channel.is_running
+        self._channel.terminate()
+        self._join_reader()
+        try:
+            if exited:
+                # raises with the tcpdump error message
+                self._channel.wait()
+        finally:
+            self._channel.close()
+
+    def wait_for_packet(
+        self,
+        timeout: float,
+        predicate: Callable[[PcapPacket], bool] | None = None,
+    ) -> PcapPacket:
+        """Wait for a captured packet, optionally matching a predicate.
+
+        :param timeout: overall seconds to wait
+        :type timeout: float
+        :param predicate: packet matcher, defaults to None (first packet)
+        :type predicate: Callable[[PcapPacket], bool] | None
+        :raises TimeoutError: if no matching packet arrived in time
+        :return: first matching packet
+        :rtype: PcapPacket
+        """
+        deadline = time.monotonic() + timeout
+        while (remaining := deadline - time.monotonic()) > 0:
+            packet = self._next_packet(remaining)
+            if packet is None:
+                break
+            if predicate is None or predicate(packet):
+                return packet
+        err_msg = f"No matching packet captured on {self._interface} in {timeout}s"
+        raise TimeoutError(err_msg)
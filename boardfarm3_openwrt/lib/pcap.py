@@ -0,0 +1,98 @@
+"""Incremental parser for libpcap capture streams."""
+
+from __future__ import annotations
+
+import struct
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+_GLOBAL_HEADER_LEN = 24
+_RECORD_HEADER_LEN = 16
+# magic number -> (byte order, timestamp fraction divisor)
+_MAGIC_NUMBERS = {
+    b"\xd4\xc3\xb2\xa1": ("<", 1_000_000),
+    b"\xa1\xb2\xc3\xd4": (">", 1_000_000),
+    b"\x4d\x3c\xb2\xa1": ("<", 1_000_000_000),
+    b"\xa1\xb2\x3c\x4d": (">", 1_000_000_000),
+}
+
+
+@dataclass(frozen=True)
+class PcapPacket:
+    """Single packet read from a pcap stream."""
+
+    timestamp: float
+    data: bytes
+    original_length: int
+    link_type: int
+
+
+class PcapStreamParser:
+    """Parse pcap bytes as they arrive, without holding the whole capture."""
+
+    def __init__(self) -> None:
+        """Initialize the pcap stream parser."""
+        self._buffer = bytearray()
+        self._byte_order: str | None = None
+        self._ts_divisor = 1_000_000
+        self._link_type = 0
+
+    @property
+    def link_type(self) -> int:
+        """Link layer header type of the capture.
+
+        :return: pcap LINKTYPE value, 0 until the global header is parsed
+        :rtype: int
+        """
+        return self._link_type
+
+    def _parse_global_header(self) -> bool:
+        """Consume the global header once enough bytes are buffered.
+
+        :raises ValueError: if the stream is not a pcap stream
+        :return: True if the global header has been parsed
+        :rtype: bool
+        """
+        if len(self._buffer) < _GLOBAL_HEADER_LEN:
+            return False
+        magic = bytes(self._buffer[:4])
+        if magic not in _MAGIC_NUMBERS:
+            err_msg = f"Not a pcap stream, unknown magic number {magic.hex()}"
+            raise ValueError(err_msg)
+        self._byte_order, self._ts_divisor = _MAGIC_NUMBERS[magic]
+        self._link_type = struct.unpack_from(f"{self._byte_order}I", self._buffer, 20)[
+            0
+        ]
+        del self._buffer[:_GLOBAL_HEADER_LEN]
+        return True
+
+    def feed(self, data: bytes) -> Iterator[PcapPacket]:
+        """Feed a chunk of the stream and yield the packets it completes.
+
+        :param data: next chunk of the pcap stream
+        :type data: bytes
+        :yield: packets completed by this chunk
+        """
+        self._buffer += data
+        if self._byte_order is None and not self._parse_global_header():
+            return
+        record_fmt = f"{self._byte_order}IIII"
+        while len(self._buffer) >= _RECORD_HEADER_LEN:
+            ts_sec, ts_frac, incl_len, orig_len = struct.unpack_from(
+                record_fmt,
+                self._buffer,
+            )
+            end = _RECORD_HEADER_LEN + incl_len
+            if len(self._buffer) < end:
+                return
+            packet_data = bytes(self._buffer[_RECORD_HEADER_LEN:end])
+            del self._buffer[:end]
+            yield PcapPacket(
+                timestamp=ts_sec + ts_frac / self._ts_divisor,
+                data=packet_data,
+                original_length=orig_len,
+                link_type=self._link_type,
+            )
@@ -0,0 +1,335 @@
+"""Readiness probes of an OpenWRT device.
+
+All probes are evaluated together in a single shell command per poll; each
+probe prints an ``ok``/``fail`` marker line. Polls are spaced exponentially
+until every probe passes or the overall deadline expires.
+
+Probes can be described in the device config, e.g.::
+
+    "readiness_probes": [
+        {"type": "interface", "interface": "br-lan"},
+        {"type": "service", "service": "dnsmasq"},
+        {"type": "default_route", "ipv6": true}
+    ]
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+import shlex
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+from boardfarm3.exceptions import DeviceBootFailure
+
+if TYPE_CHECKING:
+    from collections.abc import Generator, Iterator, Sequence
+
+    from boardfarm3.lib.boardfarm_pexpect import BoardfarmPexpect
+
+_LOGGER = logging.getLogger(__name__)
+_MARKER_REGEX = re.compile(r"^__probe_(\d+):(ok|fail)\s*$", re.MULTILINE)
+
+
+class ReadinessProbe(ABC):
+    """Condition the device must meet before it is ready."""
+
+    @property
+    @abstractmethod
+    def name(self) -> str:
+        """Probe name used in logs and errors."""
+        raise NotImplementedError
+
+    @property
+    @abstractmethod
+    def command(self) -> str:
+        """Shell command exiting with 0 when the probe passes."""
+        raise NotImplementedError
+
+
+@dataclass(frozen=True)
+class InterfaceProbe(ReadinessProbe):
+    """Interface is up and has an address."""
+
+    interface: str
+    ipv6: bool = False
+
+    @property
+    def name(self) -> str:
+        """Probe name used in logs and errors.
+
+        :return: probe name
+        :rtype: str
+        """
+        return f"interface {self.interface} ({'IPv6' if self.ipv6 else 'IPv4'})"
+
+    @property
+    def command(self) -> str:
+        """Shell command exiting with 0 when the probe passes.
+
+        :return: probe command
+        :rtype: str
+        """
+        iface = shlex.quote(self.interface)
+        family, inet = ("-6", "inet6 .* scope global") if self.ipv6 else ("-4", "inet ")
+        return (
+            f'[ "$(cat /sys/class/net/{iface}/operstate)" = up ] && '
+            f"ip {family} addr show dev {iface} | grep -q '{inet}'"
+        )
+
+
+@dataclass(frozen=True)
+class ServiceProbe(ReadinessProbe):
+    """procd service has a running instance."""
+
+    service: str
+
+    @property
+    def name(self) -> str:
+        """Probe name used in logs and errors.
+
+        :return: probe name
+        :rtype: str
+        """
+        return f"service {self.service}"
+
+    @property
+    def command(self) -> str:
+        """Shell command exiting with 0 when the probe passes.
+
+        :return: probe command
+        :rtype: str
+        """
+        request = shlex.quote(f'{{"name": "{self.service}"}}')
+        return f"ubus call service list {request} | grep -q '\"running\": true'"
+
+
+@dataclass(frozen=True)
+class DNSProbe(ReadinessProbe):
+    """DNS server on the device answers queries."""
+
+    hostname: str = "localhost"
+    server: str = "127.0.0.1"
+
+    @property
+    def name(self) -> str:
+        """Probe name used in logs and errors.
+
+        :return: probe name
+        :rtype: str
+        """
+        return f"DNS {self.hostname}@{self.server}"
+
+    @property
+    def command(self) -> str:
+        """Shell command exiting with 0 when the probe passes.
+
+        :return: probe command
+        :rtype: str
+        """
+        return f"nslookup {shlex.quote(self.hostname)} {shlex.quote(self.server)}"
+
+
+@dataclass(frozen=True)
+class DefaultRouteProbe(ReadinessProbe):
+    """Default route is present."""
+
+    ipv6: bool = False
+
+    @property
+    def name(self) -> str:
+        """Probe name used in logs and errors.
+
+        :return: probe name
+        :rtype: str
+        """
+        return f"default route ({'IPv6' if self.ipv6 else 'IPv4'})"
+
+    @property
+    def command(self) -> str:
+        """Shell command exiting with 0 when the probe passes.
+
+        :return: probe command
+        :rtype: str
+        """
+        return f"ip {'-6' if self.ipv6 else '-4'} route show default | grep -q ."
+
+
+_PROBE_TYPES: dict[str, type[ReadinessProbe]] = {
+    "interface": InterfaceProbe,
+    "service": ServiceProbe,
+    "dns": DNSProbe,
+    "default_route": DefaultRouteProbe,
+}
+
+
+def parse_probes(probe_configs: list[dict[str, Any]]) -> list[ReadinessProbe]:
+    """Build readiness probes from their device config description.
+
+    :param probe_configs: probe descriptions, the ``type`` key selects the
+        probe and the other keys are its fields
+    :type probe_configs: list[dict[str, Any]]
+    :raises ValueError: on unknown probe type or invalid probe fields
+    :return: readiness probes
+    :rtype: list[ReadinessProbe]
+    """
+    probes = []
+    for probe_config in probe_configs:
+        fields = dict(probe_config)
+        probe_type = fields.pop("type", None)
+        if probe_type not in _PROBE_TYPES:
+            err_msg = (
+                f"Unknown readiness probe type {probe_type!r}, expected one of "
+                f"{sorted(_PROBE_TYPES)}"
+            )
+            raise ValueError(err_msg)
+        try:
+            probes.append(_PROBE_TYPES[probe_type](**fields))
+        except TypeError as exc:
+            err_msg = f"Invalid {probe_type} readiness probe {probe_config}: {exc}"
+            raise ValueError(err_msg) from exc
+    return probes
+
+
+class ReadinessChecker:
+    """Poll a set of readiness probes until they all pass."""
+
+    def __init__(
+        self,
+        console: BoardfarmPexpect,
+        probes: Sequence[ReadinessProbe],
+        initial_interval: float = 0.5,
+        max_interval: float = 8.0,
+    ) -> None:
+        """Initialize the readiness checker.
+
+        :param console: device console the probes are run on
+        :type console: BoardfarmPexpect
+        :param probes: probes which must all pass
+        :type probes: Sequence[ReadinessProbe]
+        :param initial_interval: seconds before the second poll, defaults to 0.5
+        :type initial_interval: float
+        :param max_interval: upper bound of the poll spacing, defaults to 8.0
+        :type max_interval: float
+        """
+        self._console = console
+        self._probes = list(probes)
+        self._initial_interval = initial_interval
+        self._max_interval = max_interval
+
+    @property
+    def command(self) -> str:
+        """Batched shell command evaluating all the probes.
+
+        :return: shell command printing a marker line per probe
+        :rtype: str
+        """
+        return "; ".join(
+            f"if ( {probe.command} ) >/dev/null 2>&1; "
+            f"then echo __probe_{idx}:ok; else echo __probe_{idx}:fail; fi"
+            for idx, probe in enumerate(self._probes)
+        )
+
+    def poll(self) -> list[ReadinessProbe]:
+        """Evaluate all the probes with a single device query.
+
+        :return: probes which did not pass
+        :rtype: list[ReadinessProbe]
+        """
+        output = self._console.execute_command(self.command)
+        passed = {
+            int(idx) for idx, result in _MARKER_REGEX.findall(output) if result == "ok"
+        }
+        return [probe for idx, probe in enumerate(self._probes) if idx not in passed]
+
+    def _intervals(self) -> Iterator[float]:
+        """Yield exponentially growing poll intervals.
+
+        :yield: seconds to wait before the next poll
+        """
+        interval = self._initial_interval
+        while True:
+            yield interval
+            interval = min(interval * 2, self._max_interval)
+
+    def _raise_not_ready(self, failed: list[ReadinessProbe], timeout: float) -> None:
+        """Raise the readiness timeout error.
+
+        :param failed: probes which did not pass
+        :type failed: list[ReadinessProbe]
+        :param timeout: overall deadline in seconds
+        :type timeout: float
+        :raises DeviceBootFailure: always
+        """
+        names = ", ".join(probe.name for probe in failed)
+        err_msg = f"Device not ready after {timeout}s, failing probes: {names}"
+        raise DeviceBootFailure(err_msg)
+
+    def _schedule(
+        self,
+        timeout: float,
+    ) -> Generator[float, list[ReadinessProbe], None]:
+        """Schedule the polls, shared by :meth:`wait` and :meth:`wait_async`.
+
+        The failing probes of each poll are sent in, the seconds to sleep
+        before the next poll are yielded back. The generator returns once
+        no probe fails.
+
+        :param timeout: overall deadline in seconds
+        :type timeout: float
+        :yield: seconds to sleep before the next poll
+        """
+        start = time.monotonic()
+        failed = yield 0.0
+        for interval in self._intervals():
+            if not failed:
+                return
+            remaining = timeout - (time.monotonic() - start)
+            if remaining <= 0:
+                self._raise_not_ready(failed, timeout)
+            _LOGGER.debug("Waiting for: %s", ", ".join(probe.name for probe in failed))
+            failed = yield min(interval, remaining)
+
+    def wait(self, timeout: float) -> float:
+        """Wait until all the probes pass.
+
+        :param timeout: overall deadline in seconds
+        :type timeout: float
+        :return: seconds it took the device to become ready
+        :rtype: float
+        """
+        start = time.monotonic()
+        schedule = self._schedule(timeout)
+        delay = next(schedule)
+        try:
+            while True:
+                time.sleep(delay)
+                delay = schedule.send(self.poll())
+        except StopIteration:
+            return time.monotonic() - start
+
+    async def wait_async(self, timeout: float) -> float:
+        """Wait until all the probes pass, without blocking the event loop.
+
+        The console is polled from the default executor, as the pexpect
+        console only has a blocking command API.
+
+        :param timeout: overall deadline in seconds
+        :type timeout: float
+        :return: seconds it took the device to become ready
+        :rtype: float
+        """
+        start = time.monotonic()
+        loop = asyncio.get_running_loop()
+        schedule = self._schedule(timeout)
+        delay = next(schedule)
+        try:
+            while True:
+                await asyncio.sleep(delay)
+                delay = schedule.send(await loop.run_in_executor(None, self.poll))
+        except StopIteration:
+            return time.monotonic() - start
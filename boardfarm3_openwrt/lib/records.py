@@ -0,0 +1,571 @@
+"""Typed records of parsed OpenWRT device state.
+
+The records are frozen and slotted: console output is parsed once into
+``ipaddress`` objects and the records can be compared, hashed and put in sets
+to diff large state dumps cheaply. They can be pickled and deep copied too.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from ipaddress import (
+    IPv4Address,
+    IPv4Interface,
+    IPv4Network,
+    IPv6Address,
+    IPv6Interface,
+    IPv6Network,
+    ip_address,
+    ip_interface,
+    ip_network,
+)
+from typing import Any, Union
+
+IPAddress = Union[IPv4Address, IPv6Address]
+IPInterface = Union[IPv4Interface, IPv6Interface]
+IPNetwork = Union[IPv4Network, IPv6Network]
+
+_IFCONFIG_MAC = re.compile(r"(?:HWaddr|ether)\s+([0-9A-Fa-f:]{17})")
+_IFCONFIG_MTU = re.compile(r"MTU[:\s]\s*(\d+)", re.IGNORECASE)
+_IFCONFIG_FLAGS = re.compile(r"^\s+((?:[A-Z]+\s+)+)MTU:", re.MULTILINE)
+_IFCONFIG_INET = re.compile(
+    r"inet\s(?:addr:)?\s*([\d.]+)(?:.*?(?:Mask:|netmask\s)([\d.]+))?",
+)
+_IFCONFIG_INET6 = re.compile(
+    r"inet6\s(?:addr:)?\s*([0-9a-fA-F:]+)(?:/(\d+)|\s+prefixlen\s+(\d+))?"
+    r".*?(?:Scope:(\w+)|<(\w+)>)?[ \t\r]*$",
+    re.MULTILINE,
+)
+_LOGREAD_LINE = re.compile(
+    r"^(?P<date>\w{3} \w{3} +\d+ [\d:]{8} \d{4})\s+(?:\[(?P<precise>[\d.]+)\]\s+)?"
+    r"(?P<facility>\w+)\.(?P<level>\w+)\s+(?P<source>[^:\[\s]+)(?:\[\d+\])?:\s?"
+    r"(?P<message>.*)$",
+)
+_CONNTRACK_STATE = re.compile(r"[A-Z][A-Z_]+")
+# keywords of ``ip route`` lines before the destination, unicast if none
+_ROUTE_TYPES = frozenset(
+    (
+        "unicast",
+        "local",
+        "broadcast",
+        "multicast",
+        "anycast",
+        "throw",
+        "unreachable",
+        "prohibit",
+        "blackhole",
+        "nat",
+    ),
+)
+
+
+def _get_port(fields: dict[str, str], key: str) -> int | None:
+    """Return a port of a conntrack tuple, if the protocol has ports.
+
+    :param fields: key=value fields of the conntrack tuple
+    :type fields: dict[str, str]
+    :param key: sport or dport
+    :type key: str
+    :return: port number
+    :rtype: int | None
+    """
+    return int(fields[key]) if key in fields else None
+
+
+def _get_options(tokens: list[str], keys: tuple[str, ...]) -> dict[str, str]:
+    """Return the value following each key, first occurrence wins.
+
+    :param tokens: line tokens
+    :type tokens: list[str]
+    :param keys: option keywords
+    :type keys: tuple[str, ...]
+    :return: keyword -> value
+    :rtype: dict[str, str]
+    """
+    options: dict[str, str] = {}
+    for idx, key in enumerate(tokens[:-1]):
+        if key in keys:
+            options.setdefault(key, tokens[idx + 1])
+    return options
+
+
+def _split_nexthops(tokens: list[str]) -> list[list[str]]:
+    """Split the tokens of a route at its ``nexthop`` keywords.
+
+    :param tokens: route tokens
+    :type tokens: list[str]
+    :return: route tokens followed by the tokens of each nexthop
+    :rtype: list[list[str]]
+    """
+    groups: list[list[str]] = [[]]
+    for word in tokens:
+        if word == "nexthop":
+            groups.append([])
+        else:
+            groups[-1].append(word)
+    return groups
+
+
+def _get_gateway(tokens: list[str]) -> IPAddress | None:
+    """Return the ``via`` gateway of a route or nexthop.
+
+    :param tokens: route or nexthop tokens
+    :type tokens: list[str]
+    :return: gateway address, None if directly connected
+    :rtype: IPAddress | None
+    """
+    if "via" not in tokens:
+        return None
+    gateway = tokens[tokens.index("via") + 1 :]
+    # the gateway family is given when it differs, e.g. via inet6 fe80::1
+    if gateway[0] in ("inet", "inet6"):
+        gateway = gateway[1:]
+    return ip_address(gateway[0])
+
+
+class _Record:
+    """Base of the records, restoring their frozen slots when unpickled.
+
+    Frozen dataclasses with slots cannot be unpickled or deep copied before
+    Python 3.11, as the default state restore assigns the frozen fields.
+    The state is the tuple of the ``__slots__`` values of the record.
+    """
+
+    __slots__: tuple[str, ...] = ()
+
+    def __getstate__(self) -> tuple[Any, ...]:
+        """Return the field values to be pickled.
+
+        :return: field values
+        :rtype: tuple[Any, ...]
+        """
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state: tuple[Any, ...]) -> None:
+        """Restore the field values of an unpickled record.
+
+        :param state: field values
+        :type state: tuple[Any, ...]
+        """
+        for name, value in zip(self.__slots__, state):
+            object.__setattr__(self, name, value)
+
+
+@dataclass(frozen=True)
+class Address(_Record):
+    """IP address of an interface along with its prefix and scope."""
+
+    __slots__ = ("interface", "scope")
+
+    interface: IPInterface
+    scope: str
+
+    @classmethod
+    def from_string(cls, address: str, scope: str = "global") -> Address:
+        """Parse an address in ``ip/prefix`` or ``ip/netmask`` notation.
+
+        :param address: address string
+        :type address: str
+        :param scope: address scope, defaults to "global"
+        :type scope: str
+        :return: address record
+        :rtype: Address
+        """
+        return cls(ip_interface(address), scope.lower())
+
+    @property
+    def ip(self) -> IPAddress:  # pylint: disable=invalid-name
+        """IP address without the prefix.
+
+        :return: IP address
+        :rtype: IPAddress
+        """
+        return self.interface.ip
+
+    @property
+    def version(self) -> int:
+        """IP version of the address.
+
+        :return: 4 or 6
+        :rtype: int
+        """
+        return self.interface.version
+
+
+@dataclass(frozen=True)
+class Interface(_Record):
+    """Network interface with its link state and addresses."""
+
+    __slots__ = ("name", "mac", "is_up", "mtu", "addresses")
+
+    name: str
+    mac: str | None
+    is_up: bool
+    mtu: int
+    addresses: tuple[Address, ...]
+
+    @classmethod
+    def from_ifconfig(cls, name: str, output: str) -> Interface:
+        """Parse the ``ifconfig <name>`` output of busybox or net-tools.
+
+        :param name: interface name
+        :type name: str
+        :param output: ifconfig output
+        :type output: str
+        :return: interface record
+        :rtype: Interface
+        """
+        output = output.replace("\r", "")
+        mac = _IFCONFIG_MAC.search(output)
+        mtu = _IFCONFIG_MTU.search(output)
+        flags = _IFCONFIG_FLAGS.search(output)
+        is_up = "UP" in flags.group(1).split() if flags else "<UP" in output
+        addresses = [
+            Address.from_string(f"{ip}/{netmask or 32}")
+            for ip, netmask in _IFCONFIG_INET.findall(output)
+        ]
+        for ip, prefix, prefixlen, scope, scope_id in _IFCONFIG_INET6.findall(output):
+            addresses.append(
+                Address.from_string(
+                    f"{ip}/{prefix or prefixlen or 128}",
+                    scope or scope_id or "global",
+                ),
+            )
+        return cls(
+            name=name,
+            mac=mac.group(1).lower() if mac else None,
+            is_up=is_up,
+            mtu=int(mtu.group(1)) if mtu else 0,
+            addresses=tuple(addresses),
+        )
+
+    def get_addresses(self, version: int) -> list[Address]:
+        """Return the addresses of the given IP version.
+
+        :param version: 4 or 6
+        :type version: int
+        :return: addresses of the interface
+        :rtype: list[Address]
+        """
+        return [address for address in self.addresses if address.version == version]
+
+
+@dataclass(frozen=True)
+class Route(_Record):
+    """Routing table entry.
+
+    Multipath routes have no gateway nor device of their own, their
+    ``nexthops`` hold the gateway and device pairs.
+    """
+
+    __slots__ = (
+        "destination",
+        "gateway",
+        "device",
+        "metric",
+        "route_type",
+        "table",
+        "nexthops",
+    )
+
+    destination: IPNetwork
+    gateway: IPAddress | None
+    device: str | None
+    metric: int
+    route_type: str
+    table: str
+    nexthops: tuple[tuple[IPAddress | None, str | None], ...]
+
+    @classmethod
+    def from_ip_route(cls, line: str, ipv6: bool = False) -> Route:
+        """Parse a route of ``ip route show`` output.
+
+        Multipath routes are given along with their ``nexthop`` lines.
+
+        :param line: route line, e.g. ``default via 10.0.0.1 dev br-wan``
+        :type line: str
+        :param ipv6: the line comes from ``ip -6 route``, defaults to False
+        :type ipv6: bool
+        :raises ValueError: if the line is not a route, e.g. a lone nexthop
+        :return: route record
+        :rtype: Route
+        """
+        tokens = line.split()
+        if not tokens or tokens[0] == "nexthop":
+            err_msg = f"Not a route line: {line!r}"
+            raise ValueError(err_msg)
+        route_type = tokens.pop(0) if tokens[0] in _ROUTE_TYPES else "unicast"
+        tokens, *nexthop_tokens = _split_nexthops(tokens)
+        options = _get_options(tokens, ("dev", "metric", "table"))
+        destination = tokens[0]
+        if destination == "default":
+            destination = "::/0" if ipv6 else "0.0.0.0/0"
+        return cls(
+            destination=ip_network(destination, strict=False),
+            gateway=_get_gateway(tokens),
+            device=options.get("dev"),
+            metric=int(options.get("metric", 0)),
+            route_type=route_type,
+            table=options.get("table", "main"),
+            nexthops=tuple(
+                (_get_gateway(nexthop), _get_options(nexthop, ("dev",)).get("dev"))
+                for nexthop in nexthop_tokens
+            ),
+        )
+
+    @classmethod
+    def from_ip_route_output(cls, output: str, ipv6: bool = False) -> list[Route]:
+        """Parse the ``ip route show`` output.
+
+        The ``nexthop`` lines of multipath routes are folded into their route.
+
+        :param output: ip route output
+        :type output: str
+        :param ipv6: the output comes from ``ip -6 route``, defaults to False
+        :type ipv6: bool
+        :return: route records
+        :rtype: list[Route]
+        """
+        routes: list[str] = []
+        for line in output.splitlines():
+            if line.split()[:1] == ["nexthop"] and routes:
+                routes[-1] += " " + line
+            elif line.strip():
+                routes.append(line)
+        return [cls.from_ip_route(route, ipv6=ipv6) for route in routes]
+
+
+@dataclass(frozen=True)
+class Neighbour(_Record):
+    """Neighbour (ARP/NDP) table entry."""
+
+    __slots__ = ("ip", "device", "mac", "state")
+
+    ip: IPAddress  # pylint: disable=invalid-name
+    device: str | None
+    mac: str | None
+    state: str | None
+
+    @classmethod
+    def from_ip_neigh(cls, line: str) -> Neighbour:
+        """Parse a line of ``ip neigh show`` output.
+
+        :param line: neighbour line, e.g.
+            ``192.168.1.10 dev br-lan lladdr 00:11:22:33:44:55 REACHABLE``
+        :type line: str
+        :return: neighbour record
+        :rtype: Neighbour
+        """
+        tokens = line.split()
+        options = {
+            key: tokens[idx + 1]
+            for idx, key in enumerate(tokens[:-1])
+            if key in ("dev", "lladdr")
+        }
+        state = tokens[-1] if tokens[-1].isupper() else None
+        return cls(
+            ip=ip_address(tokens[0]),
+            device=options.get("dev"),
+            mac=options["lladdr"].lower() if "lladdr" in options else None,
+            state=state,
+        )
+
+    @property
+    def key(self) -> tuple[IPAddress, str | None]:
+        """Identity of the entry in the neighbour table.
+
+        :return: IP address and device
+        :rtype: tuple[IPAddress, str | None]
+        """
+        return self.ip, self.device
+
+
+@dataclass(frozen=True)
+class ConntrackEntry(_Record):
+    """Connection tracking table entry."""
+
+    __slots__ = (
+        "protocol",
+        "src",
+        "dst",
+        "sport",
+        "dport",
+        "reply_src",
+        "reply_dst",
+        "reply_sport",
+        "reply_dport",
+        "state",
+    )
+
+    protocol: str
+    src: IPAddress
+    dst: IPAddress
+    sport: int | None
+    dport: int | None
+    reply_src: IPAddress
+    reply_dst: IPAddress
+    reply_sport: int | None
+    reply_dport: int | None
+    state: str | None
+
+    @classmethod
+    def from_conntrack(cls, line: str) -> ConntrackEntry:
+        """Parse a line of ``conntrack -L`` or ``conntrack -E`` output.
+
+        :param line: conntrack line, with or without the ``[EVENT]`` prefix
+        :type line: str
+        :return: conntrack record
+        :rtype: ConntrackEntry
+        """
+        tokens = [token for token in line.split() if not token.startswith("[")]
+        original: dict[str, str] = {}
+        reply: dict[str, str] = {}
+        state = None
+        for token in tokens[1:]:
+            key, sep, value = token.partition("=")
+            if not sep:
+                if _CONNTRACK_STATE.fullmatch(token):
+                    state = token
+                continue
+            tuple_fields = reply if key in original else original
+            tuple_fields.setdefault(key, value)
+        return cls(
+            protocol=tokens[0],
+            src=ip_address(original["src"]),
+            dst=ip_address(original["dst"]),
+            sport=_get_port(original, "sport"),
+            dport=_get_port(original, "dport"),
+            reply_src=ip_address(reply["src"]),
+            reply_dst=ip_address(reply["dst"]),
+            reply_sport=_get_port(reply, "sport"),
+            reply_dport=_get_port(reply, "dport"),
+            state=state,
+        )
+
+    @property
+    def key(self) -> tuple[str, IPAddress, IPAddress, int | None, int | None]:
+        """Identity of the flow, its original direction tuple.
+
+        :return: protocol, source, destination and ports
+        :rtype: tuple[str, IPAddress, IPAddress, int | None, int | None]
+        """
+        return self.protocol, self.src, self.dst, self.sport, self.dport
+
+
+@dataclass(frozen=True)
+class Lease(_Record):
+    """DHCP lease handed out by dnsmasq."""
+
+    __slots__ = ("expiry", "mac", "ip", "hostname", "client_id")
+
+    expiry: int
+    mac: str
+    ip: IPAddress  # pylint: disable=invalid-name
+    hostname: str | None
+    client_id: str | None
+
+    @classmethod
+    def from_dnsmasq(cls, line: str) -> Lease:
+        """Parse a line of the dnsmasq leases file.
+
+        :param line: lease line, ``<expiry> <mac> <ip> <hostname> <client-id>``
+        :type line: str
+        :return: lease record
+        :rtype: Lease
+        """
+        expiry, mac, ip_addr, hostname, client_id = (line.split() + ["*"] * 5)[:5]
+        return cls(
+            expiry=int(expiry),
+            mac=mac.lower(),
+            ip=ip_address(ip_addr),
+            hostname=None if hostname == "*" else hostname,
+            client_id=None if client_id == "*" else client_id,
+        )
+
+
+@dataclass(frozen=True)
+class Station(_Record):
+    """Wireless station associated to an access point interface."""
+
+    __slots__ = ("mac", "interface", "signal", "rx_bytes", "tx_bytes")
+
+    mac: str
+    interface: str
+    signal: int | None
+    rx_bytes: int
+    tx_bytes: int
+
+    @classmethod
+    def from_iw_station_dump(cls, output: str) -> list[Station]:
+        """Parse the ``iw dev <iface> station dump`` output.
+
+        :param output: iw station dump output
+        :type output: str
+        :return: station records
+        :rtype: list[Station]
+        """
+        stations = []
+        for block in re.split(r"^(?=Station )", output, flags=re.MULTILINE):
+            header = re.match(r"Station ([0-9a-fA-F:]{17}) \(on (\S+)\)", block)
+            if header is None:
+                continue
+            fields = dict(
+                re.findall(r"^\s+([a-z ]+):\s+(-?\d+)", block, flags=re.MULTILINE),
+            )
+            stations.append(
+                cls(
+                    mac=header.group(1).lower(),
+                    interface=header.group(2),
+                    signal=int(fields["signal"]) if "signal" in fields else None,
+                    rx_bytes=int(fields.get("rx bytes", 0)),
+                    tx_bytes=int(fields.get("tx bytes", 0)),
+                ),
+            )
+        return stations
+
+
+@dataclass(frozen=True)
+class LogEntry(_Record):
+    """System log entry read with logread.
+
+    The timestamp is the epoch time of the device printed by ``logread -t``.
+    Without it, the date of the entry is parsed in the host time zone, which
+    only matches the device time when both use the same zone.
+    """
+
+    __slots__ = ("timestamp", "facility", "level", "source", "message")
+
+    timestamp: float
+    facility: str
+    level: str
+    source: str
+    message: str
+
+    @classmethod
+    def from_logread(cls, line: str) -> LogEntry | None:
+        """Parse a line of ``logread`` output.
+
+        :param line: log line, e.g.
+            ``Mon Oct 19 10:00:00 2026 daemon.info dnsmasq[12]: started``
+        :type line: str
+        :return: log entry record, None if the line is not a log entry
+        :rtype: LogEntry | None
+        """
+        if (match := _LOGREAD_LINE.match(line.strip())) is None:
+            return None
+        if match.group("precise"):
+            timestamp = float(match.group("precise"))
+        else:
+            timestamp = datetime.strptime(  # noqa: DTZ007
+                match.group("date"),
+                "%a %b %d %H:%M:%S %Y",
+            ).timestamp()
+        return cls(
+            timestamp=timestamp,
+            facility=match.group("facility"),
+            level=match.group("level"),
+            source=match.group("source"),
+            message=match.group("message"),
+        )
@@ -0,0 +1,124 @@
+"""OpenWRT configuration snapshots."""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import posixpath
+import tarfile
+from dataclasses import dataclass
+
+# UCI config name -> commands applying a change of that config
+_RELOAD_COMMANDS: dict[str, tuple[str, ...]] = {
+    "dhcp": ("/etc/init.d/dnsmasq reload", "/etc/init.d/odhcpd reload"),
+    "wireless": ("wifi reload",),
+}
+
+
+def _member_path(member: tarfile.TarInfo) -> str:
+    """Return the absolute device path of an archive member.
+
+    :param member: archive member, relative to /
+    :type member: tarfile.TarInfo
+    :return: absolute device path
+    :rtype: str
+    """
+    return "/" + member.name.removeprefix("./")
+
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """Compressed archive of device files with their MD5 digests."""
+
+    paths: tuple[str, ...]
+    archive: bytes
+    digests: dict[str, str]
+
+    @classmethod
+    def from_archive(cls, paths: tuple[str, ...], archive: bytes) -> ConfigSnapshot:
+        """Build a snapshot from a gzipped tar pulled from the device.
+
+        :param paths: device paths the archive was created from
+        :type paths: tuple[str, ...]
+        :param archive: gzipped tar archive, members relative to /
+        :type archive: bytes
+        :return: snapshot of the archived files
+        :rtype: ConfigSnapshot
+        """
+        digests = {}
+        with tarfile.open(fileobj=io.BytesIO(archive), mode="r:gz") as tar:
+            for member in tar:
+                if member.isfile():
+                    content = tar.extractfile(member).read()
+                    digest = hashlib.md5(content).hexdigest()  # noqa: S324
+                    digests[_member_path(member)] = digest
+        return cls(paths, archive, digests)
+
+    def changed_files(self, current_digests: dict[str, str]) -> list[str]:
+        """Return the snapshot files whose content differs on the device.
+
+        :param current_digests: device path -> MD5 digest of the device files
+        :type current_digests: dict[str, str]
+        :return: files to be pushed back to the device
+        :rtype: list[str]
+        """
+        return sorted(
+            path
+            for path, digest in self.digests.items()
+            if current_digests.get(path) != digest
+        )
+
+    def added_files(self, current_digests: dict[str, str]) -> list[str]:
+        """Return the device files created after the snapshot was taken.
+
+        :param current_digests: device path -> MD5 digest of the device files
+        :type current_digests: dict[str, str]
+        :return: files to be removed from the device
+        :rtype: list[str]
+        """
+        return sorted(set(current_digests) - set(self.digests))
+
+    def build_archive(self, files: list[str]) -> bytes:
+        """Build a gzipped tar holding only the given snapshot files.
+
+        :param files: device paths to be included
+        :type files: list[str]
+        :return: gzipped tar archive, members relative to /
+        :rtype: bytes
+        """
+        wanted = set(files)
+        output = io.BytesIO()
+        with (
+            tarfile.open(
+                fileobj=io.BytesIO(self.archive),
+                mode="r:gz",
+            ) as source,
+            tarfile.open(fileobj=output, mode="w:gz") as target,
+        ):
+            for member in source:
+                if member.isfile() and _member_path(member) in wanted:
+                    target.addfile(member, source.extractfile(member))
+        return output.getvalue()
+
+
+def get_reload_commands(files: list[str]) -> list[str]:
+    """Return the commands applying changes of the given config files.
+
+    Files of ``/etc/config/<name>`` reload the ``<name>`` init script, if
+    there is one, unless the config is known to belong to other services.
+
+    :param files: changed device files
+    :type files: list[str]
+    :return: reload commands, in a stable order and without duplicates
+    :rtype: list[str]
+    """
+    commands: dict[str, None] = {}
+    for path in files:
+        directory, name = posixpath.split(path)
+        if directory != "/etc/config":
+            continue
+        init_script = f"/etc/init.d/{name}"
+        default_commands = (f"[ -x {init_script} ] && {init_script} reload",)
+        for command in _RELOAD_COMMANDS.get(name, default_commands):
+            commands[command] = None
+    return list(commands)
@@ -0,0 +1,301 @@
+"""Dedicated SSH channel to an OpenWRT device.
+
+The interactive console is a text oriented pexpect session shared by all the
+device libraries. Binary streams (pcap, tar) and long running commands are run
+on a separate ``ssh`` process instead, with its stdin/stdout exposed as raw
+byte pipes.
+
+sshd does not signal a command run without a tty when the connection goes
+away, so commands without stdin data are wrapped to kill their whole process
+tree once the channel stdin is closed; long running commands such as
+``tcpdump`` or ``logread -f`` do not outlive their channel on the device.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+import shutil
+import subprocess
+import threading
+from typing import IO, TYPE_CHECKING
+
+from boardfarm3.exceptions import DeviceConnectionError
+
+if TYPE_CHECKING:
+    from types import TracebackType
+
+_LOGGER = logging.getLogger(__name__)
+_EXIT_TIMEOUT = 5
+# Shell snippets around the device command: the command runs in the
+# background and a watcher kills its process tree on stdin EOF.
+_WRAPPER_HEAD = (
+    "_kill_tree() { "
+    'for _child in $(grep -l "^PPid:[[:space:]]*$1\\$" /proc/[0-9]*/status '
+    "2>/dev/null); do _child=${_child#/proc/}; _kill_tree ${_child%/status}; "
+    "done; kill $1 2>/dev/null; }; "
+    "exec 3<&0; { "
+)
+_WRAPPER_TAIL = (
+    " ; } </dev/null 3<&- & _pid=$!; "
+    "{ cat <&3 >/dev/null 2>&1; _kill_tree $_pid; } >/dev/null 2>&1 & "
+    "_watcher=$!; wait $_pid; _status=$?; _kill_tree $_watcher; exit $_status"
+)
+
+
+class SSHChannel:
+    """Run a single command on the device over its own SSH connection."""
+
+    def __init__(  # noqa: PLR0913
+        self,
+        command: str,
+        ipaddr: str,
+        port: str,
+        username: str,
+        password: str,
+        with_stdin: bool = False,
+    ) -> None:
+        """Initialize the SSH channel.
+
+        The command is not started until :meth:`start` is called.
+
+        :param command: command to be executed on the device
+        :type command: str
+        :param ipaddr: management IP address of the device
+        :type ipaddr: str
+        :param port: SSH port of the device
+        :type port: str
+        :param username: SSH username
+        :type username: str
+        :param password: SSH password, key based auth is used if empty
+        :type password: str
+        :param with_stdin: pipe data to the command stdin, defaults to False
+            (stdin is then kept open to kill the command when it is closed)
+        :type with_stdin: bool
+        """
+        self._command = command
+        self._ipaddr = ipaddr
+        self._port = port
+        self._username = username
+        self._password = password
+        self._with_stdin = with_stdin
+        self._process: subprocess.Popen[bytes] | None = None
+        self._stderr_lines: list[str] = []
+        self._stderr_closed = False
+        self._stderr_condition = threading.Condition()
+        self._stderr_reader: threading.Thread | None = None
+
+    def _build_command(self) -> tuple[list[str], dict[str, str]]:
+        """Build the local ssh command line and its environment.
+
+        :return: ssh argv and environment
+        :rtype: tuple[list[str], dict[str, str]]
+        """
+        env = dict(os.environ)
+        argv = [
+            "ssh",
+            "-T",
+            "-o",
+            "StrictHostKeyChecking=no",
+            "-o",
+            "UserKnownHostsFile=/dev/null",
+            "-o",
+            "LogLevel=ERROR",
+            "-o",
+            "ServerAliveInterval=10",
+            "-p",
+            str(self._port),
+            f"{self._username}@{self._ipaddr}",
+            (
+                self._command
+                if self._with_stdin
+                else _WRAPPER_HEAD + self._command + _WRAPPER_TAIL
+            ),
+        ]
+        if self._password and shutil.which("sshpass"):
+            env["SSHPASS"] = self._password
+            argv = ["sshpass", "-e", *argv]
+        else:
+            argv[1:1] = ["-o", "BatchMode=yes"]
+        return argv, env
+
+    def start(self) -> SSHChannel:
+        """Start the command on the device.
+
+        :raises DeviceConnectionError: when the ssh process cannot be started
+        :return: the started channel
+        :rtype: SSHChannel
+        """
+        argv, env = self._build_command()
+        _LOGGER.debug("Opening SSH channel to %s: %s", self._ipaddr, self._command)
+        try:
+            self._process = subprocess.Popen(  # noqa: S603
+                argv,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                env=env,
+            )
+        except OSError as exc:
+            err_msg = f"Failed to open SSH channel to {self._ipaddr}: {exc}"
+            raise DeviceConnectionError(err_msg) from exc
+        self._stderr_reader = threading.Thread(
+            target=self._read_stderr,
+            name="ssh-stderr",
+            daemon=True,
+        )
+        self._stderr_reader.start()
+        return self
+
+    def _read_stderr(self) -> None:
+        """Collect the command standard error lines until the channel closes."""
+        try:
+            for raw_line in self._process.stderr:
+                with self._stderr_condition:
+                    self._stderr_lines.append(raw_line.decode(errors="replace"))
+                    self._stderr_condition.notify_all()
+        except (OSError, ValueError):
+            _LOGGER.debug("Standard error of '%s' closed", self._command)
+        finally:
+            with self._stderr_condition:
+                self._stderr_closed = True
+                self._stderr_condition.notify_all()
+
+    @property
+    def stdout(self) -> IO[bytes]:
+        """Command standard output.
+
+        :return: byte stream of the command output
+        :rtype: IO[bytes]
+        """
+        return self._process.stdout
+
+    @property
+    def stdin(self) -> IO[bytes]:
+        """Command standard input.
+
+        :return: byte stream of the command input
+        :rtype: IO[bytes]
+        """
+        return self._process.stdin
+
+    @property
+    def stderr(self) -> str:
+        """Command standard error received so far.
+
+        :return: standard error text of the command and of ssh itself
+        :rtype: str
+        """
+        with self._stderr_condition:
+            return "".join(self._stderr_lines).strip()
+
+    def wait_for_stderr(self, pattern: str, timeout: float) -> bool:
+        """Wait for a standard error line matching a pattern.
+
+        :param pattern: regular expression searched in each line
+        :type pattern: str
+        :param timeout: seconds to wait
+        :type timeout: float
+        :return: True if a line matched, False on timeout or if the command
+            exited without printing it
+        :rtype: bool
+        """
+        regex = re.compile(pattern)
+
+        def matched() -> bool:
+            return any(map(regex.search, self._stderr_lines))
+
+        with self._stderr_condition:
+            self._stderr_condition.wait_for(
+                lambda: matched() or self._stderr_closed,
+                timeout,
+            )
+            return matched()
+
+    @property
+    def is_running(self) -> bool:
+        """Whether the remote command is still running.
+
+        :return: True if the ssh process has not exited
+        :rtype: bool
+        """
+        return self._process is not None and self._process.poll() is None
+
+    def wait(self, timeout: float | None = None) -> int:
+        """Wait for the command to finish, closing stdin if data was piped in.
+
+        :param timeout: seconds to wait, defaults to None (forever)
+        :type timeout: float | None
+        :raises DeviceConnectionError: when the command exits with an error
+        :return: exit status of the command
+        :rtype: int
+        """
+        if self._with_stdin and not self._process.stdin.closed:
+            self._process.stdin.close()
+        returncode = self._process.wait(timeout)
+        if self._stderr_reader is not None:
+            self._stderr_reader.join(_EXIT_TIMEOUT)
+        if returncode != 0:
+            err_msg = f"'{self._command}' failed on {self._ipaddr}: {self.stderr}"
+            raise DeviceConnectionError(err_msg)
+        return returncode
+
+    def terminate(self) -> None:
+        """Terminate the remote command, leaving buffered output readable.
+
+        Closing stdin makes the device side kill the command, the local ssh
+        process is only killed if the channel does not exit in time.
+        """
+        if self._process is None or self._process.poll() is not None:
+            return
+        if not self._process.stdin.closed:
+            try:
+                self._process.stdin.close()
+            except OSError:
+                _LOGGER.debug("Standard input of '%s' already broken", self._command)
+        try:
+            self._process.wait(_EXIT_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            self._process.terminate()
+            try:
+                self._process.wait(_EXIT_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+                self._process.wait()
+
+    def close(self) -> None:
+        """Terminate the remote command and release the pipes."""
+        if self._process is None:
+            return
+        self.terminate()
+        if self._stderr_reader is not None:
+            self._stderr_reader.join(_EXIT_TIMEOUT)
+        for pipe in (self._process.stdin, self._process.stdout, self._process.stderr):
+            if pipe is not None and not pipe.closed:
+                pipe.close()
+
+    def __enter__(self) -> SSHChannel:
+        """Start the channel on entering the context.
+
+        :return: the started channel
+        :rtype: SSHChannel
+        """
+        return self.start()
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Close the channel on leaving the context.
+
+        :param exc_type: exception type
+        :type exc_type: type[BaseException] | None
+        :param exc_value: exception instance
+        :type exc_value: BaseException | None
+        :param traceback: traceback
+        :type traceback: TracebackType | None
+        """
+        self.close()
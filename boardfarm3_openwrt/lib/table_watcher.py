@@ -0,0 +1,415 @@
+"""Event driven mirrors of the OpenWRT conntrack, routing and neighbour tables.
+
+Each watcher runs on a dedicated SSH channel: the table is dumped once, then
+the kernel events (``conntrack -E``, ``ip monitor``) are applied to an in
+memory mirror, so tests can query the tables and wait on predicates without
+re-dumping them over the console.
+
+The event subscription is started before the dump and its events are held in
+the device pipe until the dump is complete, so no event is lost between the
+two. Events raised during the dump are applied after it. The subscriber is
+given ``subscribe_delay`` seconds to subscribe before the dump starts, events
+raised before it has subscribed on a slow device are missed.
+
+Events beyond the pipe capacity (64KiB) during the dump, or a reader falling
+behind, make the kernel drop events. The subscriber stderr is streamed along
+with the events, so its overflow warning marks the mirror stale, as does the
+end of the event stream; :meth:`TableWatcher.wait_until` then raises.
+
+The ``conntrack`` and ``ip-full`` packages are needed on the device.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from abc import abstractmethod
+from ipaddress import ip_address
+from typing import IO, TYPE_CHECKING, TypeVar
+
+from boardfarm3.exceptions import DeviceConnectionError
+
+from boardfarm3_openwrt.lib.channel_reader import ChannelReader
+from boardfarm3_openwrt.lib.records import ConntrackEntry, Neighbour, Route
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from boardfarm3_openwrt.templates.openwrt.openwrt_hw import OpenWRTHW
+
+_LOGGER = logging.getLogger(__name__)
+_SYNC_MARKER = "__table_synced__"
+# subscriber warnings of events dropped by the kernel, from conntrack and ip
+_OVERFLOW_MARKERS = ("ENOBUFS", "No buffer space available")
+
+_WatcherT = TypeVar("_WatcherT", bound="TableWatcher")
+
+
+def _subscribe_then_dump(
+    events_command: str,
+    dump_command: str,
+    subscribe_delay: float,
+) -> str:
+    """Build the command following events without a gap after the dump.
+
+    The events, along with the subscriber errors, are queued in the pipe
+    while the table is dumped, then streamed after the sync marker.
+
+    :param events_command: command printing the table events
+    :type events_command: str
+    :param dump_command: command printing the table
+    :type dump_command: str
+    :param subscribe_delay: seconds given to the subscriber before the dump
+    :type subscribe_delay: float
+    :return: shell command
+    :rtype: str
+    """
+    return (
+        f"{events_command} 2>&1 | {{ sleep {subscribe_delay}; {dump_command}; "
+        f"echo {_SYNC_MARKER}; cat; }}"
+    )
+
+
+class TableWatcher(ChannelReader):
+    """Mirror of a device table kept up to date by kernel events."""
+
+    def __init__(self, hardware: OpenWRTHW, subscribe_delay: float = 1) -> None:
+        """Initialize the table watcher.
+
+        :param hardware: OpenWRT hardware instance
+        :type hardware: OpenWRTHW
+        :param subscribe_delay: seconds given to the event subscriber before
+            the dump, increase it on slow devices, defaults to 1
+        :type subscribe_delay: float
+        """
+        super().__init__(hardware)
+        self._subscribe_delay = subscribe_delay
+        self._synced = False
+        self._stale_reason: str | None = None
+        self.event_count = 0
+
+    @property
+    @abstractmethod
+    def _command(self) -> str:
+        """Command dumping the table, printing the marker and following events."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def _apply(self, line: str) -> None:
+        """Apply a dump line or an event line to the mirror.
+
+        :param line: dump or event line
+        :type line: str
+        """
+        raise NotImplementedError
+
+    def start(self: _WatcherT, timeout: float = 60) -> _WatcherT:
+        """Start the watcher and wait until the initial dump is mirrored.
+
+        :param timeout: seconds to wait for the initial dump, defaults to 60
+        :type timeout: float
+        :raises TimeoutError: if the initial dump did not complete in time
+        :return: the started watcher
+        :rtype: TableWatcher
+        """
+        self._open_channel(self._command)
+        self._start_reader(type(self).__name__)
+        with self._condition:
+            self._condition.wait_for(lambda: self._synced or not self._running, timeout)
+            synced = self._synced
+        if not synced:
+            self.stop()
+            err_msg = f"{type(self).__name__} initial table dump did not complete"
+            raise TimeoutError(err_msg)
+        return self
+
+    @property
+    def stale_reason(self) -> str | None:
+        """Reason the mirror no longer follows the device table.
+
+        :return: reason, None while the mirror is up to date
+        :rtype: str | None
+        """
+        with self._condition:
+            return self._stale_reason
+
+    def _mark_stale(self, reason: str) -> None:
+        """Mark the mirror as no longer following the device table.
+
+        :param reason: first reason the mirror went stale
+        :type reason: str
+        """
+        if self._stale_reason is None:
+            _LOGGER.warning("%s is stale: %s", type(self).__name__, reason)
+            self._stale_reason = reason
+
+    def _consume(self, stream: IO[bytes]) -> None:
+        """Apply the channel lines to the mirror and wake up the waiters.
+
+        :param stream: dump, sync marker and event lines
+        :type stream: IO[bytes]
+        """
+        try:
+            for raw_line in stream:
+                line = raw_line.decode(errors="replace").strip()
+                if not line:
+                    continue
+                with self._condition:
+                    if line == _SYNC_MARKER:
+                        self._synced = True
+                    else:
+                        self._apply_line(line)
+                    self._condition.notify_all()
+        finally:
+            with self._condition:
+                self._mark_stale("event stream ended")
+
+    def _apply_line(self, line: str) -> None:
+        """Apply a line, skipping the ones which cannot be parsed.
+
+        :param line: dump or event line, or subscriber error
+        :type line: str
+        """
+        if any(marker in line for marker in _OVERFLOW_MARKERS):
+            self._mark_stale(f"events dropped: {line}")
+            return
+        try:
+            self._apply(line)
+        except (KeyError, ValueError, IndexError):
+            _LOGGER.debug("%s skipped line: %s", type(self).__name__, line)
+            return
+        if self._synced:
+            self.event_count += 1
+
+    def wait_until(
+        self: _WatcherT,
+        predicate: Callable[[_WatcherT], bool],
+        timeout: float,
+    ) -> None:
+        """Wait until the mirrored table satisfies a predicate.
+
+        The predicate is evaluated with the watcher locked, after every event.
+
+        .. code-block:: python
+
+            watcher.wait_until(lambda ct: ct.find(dst=wan_ip, dport=80), 10)
+
+        :param predicate: condition on the watcher
+        :type predicate: Callable[[TableWatcher], bool]
+        :param timeout: seconds to wait
+        :type timeout: float
+        :raises DeviceConnectionError: if the mirror is stale, e.g. events
+            were dropped or the watcher was stopped
+        :raises TimeoutError: if the predicate did not become true in time
+        """
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while not predicate(self):
+                if self._stale_reason is not None:
+                    err_msg = (
+                        f"{type(self).__name__} mirror is stale: {self._stale_reason}"
+                    )
+                    raise DeviceConnectionError(err_msg)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._running:
+                    err_msg = f"{type(self).__name__} condition not met in {timeout}s"
+                    raise TimeoutError(err_msg)
+                self._condition.wait(remaining)
+
+
+class ConntrackWatcher(TableWatcher):
+    """Mirror of the connection tracking table."""
+
+    def __init__(self, hardware: OpenWRTHW, subscribe_delay: float = 1) -> None:
+        """Initialize the conntrack watcher.
+
+        :param hardware: OpenWRT hardware instance
+        :type hardware: OpenWRTHW
+        :param subscribe_delay: seconds given to the event subscriber before
+            the dump, increase it on slow devices, defaults to 1
+        :type subscribe_delay: float
+        """
+        super().__init__(hardware, subscribe_delay)
+        self._entries: dict[tuple, ConntrackEntry] = {}
+
+    @property
+    def _command(self) -> str:
+        """Command dumping the table, printing the marker and following events.
+
+        :return: conntrack command
+        :rtype: str
+        """
+        return _subscribe_then_dump(
+            "conntrack -E -e NEW,UPDATE,DESTROY",
+            "conntrack -L",
+            self._subscribe_delay,
+        )
+
+    def _apply(self, line: str) -> None:
+        """Apply a dump line or an event line to the mirror.
+
+        :param line: conntrack dump or event line
+        :type line: str
+        """
+        entry = ConntrackEntry.from_conntrack(line)
+        if line.startswith("[DESTROY]"):
+            self._entries.pop(entry.key, None)
+        else:
+            self._entries[entry.key] = entry
+
+    @property
+    def entries(self) -> list[ConntrackEntry]:
+        """Mirrored conntrack entries.
+
+        :return: conntrack entries
+        :rtype: list[ConntrackEntry]
+        """
+        with self._condition:
+            return list(self._entries.values())
+
+    def find(self, **fields: object) -> list[ConntrackEntry]:
+        """Return the entries whose fields equal the given values.
+
+        IP addresses can be given as strings, e.g. ``find(dst="10.0.0.2")``.
+
+        :param fields: ConntrackEntry field values
+        :type fields: object
+        :return: matching conntrack entries
+        :rtype: list[ConntrackEntry]
+        """
+        expected = {
+            key: ip_address(str(value)) if key.endswith(("src", "dst")) else value
+            for key, value in fields.items()
+        }
+        with self._condition:
+            return [
+                entry
+                for entry in self._entries.values()
+                if all(getattr(entry, key) == value for key, value in expected.items())
+            ]
+
+
+def _parse_route(line: str) -> Route:
+    """Parse a route line of either family.
+
+    The gateway family can differ from the route one (``via inet6``), so a
+    default route is IPv6 when it has a ``pref``, which the kernel reports
+    for every IPv6 route and only for those.
+
+    :param line: route line, with its nexthops if any
+    :type line: str
+    :return: route record
+    :rtype: Route
+    """
+    return Route.from_ip_route(line, ipv6="pref" in line.split())
+
+
+class RouteWatcher(TableWatcher):
+    """Mirror of the main routing table and of the neighbour table.
+
+    ``ip monitor`` reports the routes of every table, the routes of the other
+    tables (e.g. ``local``) are left out as they are not part of the dump.
+    """
+
+    def __init__(self, hardware: OpenWRTHW, subscribe_delay: float = 1) -> None:
+        """Initialize the route watcher.
+
+        :param hardware: OpenWRT hardware instance
+        :type hardware: OpenWRTHW
+        :param subscribe_delay: seconds given to the event subscriber before
+            the dump, increase it on slow devices, defaults to 1
+        :type subscribe_delay: float
+        """
+        super().__init__(hardware, subscribe_delay)
+        self._routes: set[Route] = set()
+        self._neighbours: dict[tuple, Neighbour] = {}
+        # last route line and whether it was deleted, for its nexthop lines
+        self._last_route: tuple[str, bool] | None = None
+
+    @property
+    def _command(self) -> str:
+        """Command dumping the tables, printing the marker and following events.
+
+        :return: ip command
+        :rtype: str
+        """
+        return _subscribe_then_dump(
+            "ip monitor label route neigh",
+            "{ ip -4 route show; ip -6 route show; } | sed 's/^/[ROUTE]/'; "
+            "ip neigh show | sed 's/^/[NEIGH]/'",
+            self._subscribe_delay,
+        )
+
+    def _apply(self, line: str) -> None:
+        """Apply a dump line or an event line to the mirrors.
+
+        :param line: ``[ROUTE]``/``[NEIGH]`` labelled line, or a ``nexthop``
+            line of the previous multipath route, unlabelled in events
+        :type line: str
+        """
+        label, _, line = line.rpartition("]")
+        deleted = line.startswith("Deleted ")
+        line = line.removeprefix("Deleted ").strip()
+        if line.startswith("nexthop"):
+            self._apply_nexthop(line)
+        elif label == "[ROUTE":
+            self._last_route = line, deleted
+            self._apply_route(line, deleted)
+        elif label == "[NEIGH":
+            neighbour = Neighbour.from_ip_neigh(line)
+            if deleted:
+                self._neighbours.pop(neighbour.key, None)
+            else:
+                self._neighbours[neighbour.key] = neighbour
+
+    def _apply_route(self, line: str, deleted: bool) -> None:
+        """Apply a route of the main table to the mirror.
+
+        :param line: route line, with its nexthops if any
+        :type line: str
+        :param deleted: the route was deleted
+        :type deleted: bool
+        """
+        route = _parse_route(line)
+        if route.table != "main":
+            return
+        if deleted:
+            self._routes.discard(route)
+        else:
+            self._routes.add(route)
+
+    def _apply_nexthop(self, line: str) -> None:
+        """Fold a nexthop line into the previous multipath route.
+
+        :param line: nexthop line
+        :type line: str
+        :raises ValueError: if no route line preceded the nexthop
+        """
+        if self._last_route is None:
+            err_msg = f"Nexthop without a route: {line!r}"
+            raise ValueError(err_msg)
+        route_line, deleted = self._last_route
+        if not deleted:
+            self._routes.discard(_parse_route(route_line))
+        self._last_route = f"{route_line} {line}", deleted
+        self._apply_route(*self._last_route)
+
+    @property
+    def routes(self) -> list[Route]:
+        """Mirrored routes.
+
+        :return: route records
+        :rtype: list[Route]
+        """
+        with self._condition:
+            return list(self._routes)
+
+    @property
+    def neighbours(self) -> list[Neighbour]:
+        """Mirrored neighbour entries.
+
+        :return: neighbour records
+        :rtype: list[Neighbour]
+        """
+        with self._condition:
+            return list(self._neighbours.values())
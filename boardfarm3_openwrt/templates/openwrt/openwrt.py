@@ -8,6 +8,7 @@ from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from ipaddress import IPv4Address, IPv4Network
 
+    from boardfarm3_openwrt.lib.readiness import ReadinessProbe
     from boardfarm3_openwrt.templates.openwrt.openwrt_hw import OpenWRTHW
     from boardfarm3_openwrt.templates.openwrt.openwrt_sw import OpenWRTSW
 
@@ -84,3 +85,20 @@ class OpenWRT(ABC):
         :rtype: str
         """
         raise NotImplementedError
+
+    @abstractmethod
+    def wait_for_ready(
+        self,
+        probes: list[ReadinessProbe] | None = None,
+        timeout: float | None = None,
+    ) -> float:
+        """Wait until the device services are up.
+
+        :param probes: probes to be evaluated, defaults to the device probes
+        :type probes: list[ReadinessProbe] | None
+        :param timeout: seconds to wait, defaults to the device timeout
+        :type timeout: float | None
+        :return: seconds it took the device to become ready
+        :rtype: float
+        """
+        raise NotImplementedError
@@ -6,8 +6,13 @@ from abc import ABC, abstractmethod
 from typing import TYPE_CHECKING, Any
 
 if TYPE_CHECKING:
+    from collections.abc import Iterable
+    from pathlib import Path
+
     from boardfarm3.lib.boardfarm_pexpect import BoardfarmPexpect
 
+    from boardfarm3_openwrt.lib.ssh_channel import SSHChannel
+
 
 class OpenWRTHW(ABC):
     """OpenWRT hardware template."""
@@ -46,3 +51,56 @@ class OpenWRTHW(ABC):
         :rtype: Dict[str, BoardfarmPexpect]
         """
         raise NotImplementedError
+
+    @abstractmethod
+    def open_ssh_channel(self, command: str, with_stdin: bool = False) -> SSHChannel:
+        """Start a command on a dedicated SSH channel.
+
+        :param command: command to be executed on the device
+        :type command: str
+        :param with_stdin: open a pipe to the command stdin, defaults to False
+        :type with_stdin: bool
+        :returns: started SSH channel
+        :rtype: SSHChannel
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def push_files(
+        self,
+        local_paths: Iterable[str | Path],
+        remote_dir: str,
+        compress: bool = True,
+    ) -> list[str]:
+        """Push local files and directories onto the device.
+
+        :param local_paths: local files or directories
+        :type local_paths: Iterable[str | Path]
+        :param remote_dir: absolute device directory, created if needed
+        :type remote_dir: str
+        :param compress: gzip the stream, defaults to True
+        :type compress: bool
+        :returns: device paths of the pushed files
+        :rtype: list[str]
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def pull_files(
+        self,
+        remote_paths: Iterable[str],
+        local_dir: str | Path,
+        compress: bool = True,
+    ) -> list[Path]:
+        """Pull device files and directories into a local directory.
+
+        :param remote_paths: absolute device files or directories
+        :type remote_paths: Iterable[str]
+        :param local_dir: local destination directory
+        :type local_dir: str | Path
+        :param compress: gzip the stream, defaults to True
+        :type compress: bool
+        :returns: local paths of the pulled files
+        :rtype: list[Path]
+        """
+        raise NotImplementedError
@@ -11,6 +11,11 @@ if TYPE_CHECKING:
     from boardfarm3.lib.boardfarm_pexpect import BoardfarmPexpect
     from boardfarm3.lib.networking import DNS, IptablesFirewall
 
+    from boardfarm3_openwrt.lib.log_follower import LogFollower
+    from boardfarm3_openwrt.lib.records import Interface, Lease, Route, Station
+    from boardfarm3_openwrt.lib.snapshot import ConfigSnapshot
+    from boardfarm3_openwrt.lib.table_watcher import ConntrackWatcher, RouteWatcher
+
 
 class OpenWRTSW(ABC):
     """OpenWRT Software Template."""
@@ -84,6 +89,131 @@ class OpenWRTSW(ABC):
         """
         raise NotImplementedError
 
+    @abstractmethod
+    def get_interface(self, interface: str) -> Interface:
+        """Return the link state and addresses of the given interface.
+
+        :param interface: interface name
+        :type interface: str
+        :return: interface record
+        :rtype: Interface
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_routes(self, ipv6: bool = False) -> list[Route]:
+        """Return the main routing table.
+
+        :param ipv6: IPv6 routing table, defaults to False
+        :type ipv6: bool
+        :return: route records
+        :rtype: list[Route]
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_dhcp_leases(self) -> list[Lease]:
+        """Return the DHCP leases handed out by dnsmasq.
+
+        :return: lease records
+        :rtype: list[Lease]
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_wifi_stations(self, interface: str) -> list[Station]:
+        """Return the stations associated to a wireless interface.
+
+        :param interface: wireless interface name
+        :type interface: str
+        :return: station records
+        :rtype: list[Station]
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def take_snapshot(self, paths: tuple[str, ...] | None = None) -> ConfigSnapshot:
+        """Take a snapshot of the device configuration.
+
+        :param paths: device paths to be saved, defaults to /etc/config and
+            /tmp/.uci
+        :type paths: tuple[str, ...] | None
+        :return: configuration snapshot
+        :rtype: ConfigSnapshot
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def restore_snapshot(self, snapshot: ConfigSnapshot) -> list[str]:
+        """Restore the device configuration saved in a snapshot.
+
+        :param snapshot: snapshot returned by take_snapshot
+        :type snapshot: ConfigSnapshot
+        :return: device files that were restored or removed, reverted uci
+            changes included
+        :rtype: list[str]
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def start_log_follower(
+        self,
+        daemons: list[str] | None = None,
+        level: str | None = None,
+        max_entries: int = 10000,
+    ) -> LogFollower:
+        """Start following the system log in the background.
+
+        :param daemons: only keep entries of these daemons, defaults to None
+        :type daemons: list[str] | None
+        :param level: only keep entries of this level or more severe,
+            defaults to None
+        :type level: str | None
+        :param max_entries: number of entries kept in memory, defaults to 10000
+        :type max_entries: int
+        :return: started log follower
+        :rtype: LogFollower
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def start_conntrack_watcher(
+        self,
+        timeout: float = 60,
+        subscribe_delay: float = 1,
+    ) -> ConntrackWatcher:
+        """Start mirroring the conntrack table from its events.
+
+        :param timeout: seconds to wait for the initial dump, defaults to 60
+        :type timeout: float
+        :param subscribe_delay: seconds given to the event subscriber before
+            the dump, events raised before it subscribed are missed, increase
+            it on slow devices, defaults to 1
+        :type subscribe_delay: float
+        :return: started conntrack watcher
+        :rtype: ConntrackWatcher
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def start_route_watcher(
+        self,
+        timeout: float = 60,
+        subscribe_delay: float = 1,
+    ) -> RouteWatcher:
+        """Start mirroring the routing and neighbour tables from their events.
+
+        :param timeout: seconds to wait for the initial dump, defaults to 60
+        :type timeout: float
+        :param subscribe_delay: seconds given to the event subscriber before
+            the dump, events raised before it subscribed are missed, increase
+            it on slow devices, defaults to 1
+        :type subscribe_delay: float
+        :return: started route watcher
+        :rtype: RouteWatcher
+        """
+        raise NotImplementedError
+
     @abstractmethod
     def _get_console(self, usage: str) -> BoardfarmPexpect:
         """Return console instance for the given usage.
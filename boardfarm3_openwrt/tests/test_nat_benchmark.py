@@ -0,0 +1,50 @@
+"""Measure the NAT connection-setup rate of the board."""
+
+import pytest
+from boardfarm3.lib.device_manager import DeviceManager
+from boardfarm3.templates.lan import LAN
+from boardfarm3.templates.wan import WAN
+from pytest_boardfarm3.lib.test_logger import TestLogger
+
+from boardfarm3_openwrt.templates.openwrt import OpenWRT
+from boardfarm3_openwrt.use_cases.nat_benchmark import measure_nat_connection_rate
+
+
+@pytest.mark.env_req(
+    {
+        "environment_def": {
+            "board": {
+                "eRouter_Provisioning_mode": [
+                    "dual",
+                    "ipv4",
+                ],
+                "lan_clients": [{}, {}],
+            },
+        },
+    },
+)
+def test_nat_connection_rate(
+    bf_logger: TestLogger,
+    device_manager: DeviceManager,
+) -> None:
+    """Measure the TCP NAT connection-setup rate ceiling of the board.
+
+    :param bf_logger: bf_logger instance
+    :type bf_logger: TestLogger
+    :param device_manager: device manager instance
+    :type device_manager: DeviceManager
+    """
+    board = device_manager.get_device_by_type(
+        OpenWRT,  # type: ignore[type-abstract]
+    )
+    lan_clients = list(
+        device_manager.get_devices_by_type(LAN).values(),  # type: ignore[type-abstract]
+    )
+    wan = device_manager.get_device_by_type(WAN)  # type: ignore[type-abstract]
+    bf_logger.log_step("Step1: Raise the new TCP flow rate from LAN to WAN")
+    result = measure_nat_connection_rate(board, lan_clients, wan, step_duration=5)
+    bf_logger.log_step(
+        f"Step2: Check a connection rate ceiling of {result.max_connection_rate:.0f}"
+        " conn/s was measured",
+    )
+    assert result.max_connection_rate > 0
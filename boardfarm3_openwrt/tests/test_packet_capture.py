@@ -0,0 +1,53 @@
+"""Check that traffic forwarded by the board can be captured on its WAN side."""
+
+import pytest
+from boardfarm3.lib.device_manager import DeviceManager
+from boardfarm3.templates.lan import LAN
+from boardfarm3.templates.wan import WAN
+from pytest_boardfarm3.lib.test_logger import TestLogger
+
+from boardfarm3_openwrt.templates.openwrt import OpenWRT
+from boardfarm3_openwrt.use_cases.packet_capture import capture_packets
+from boardfarm3_openwrt.use_cases.ping import ping
+
+_PING_COUNT = 4
+
+
+@pytest.mark.env_req(
+    {
+        "environment_def": {
+            "board": {
+                "eRouter_Provisioning_mode": [
+                    "dual",
+                    "ipv4",
+                ],
+                "lan_clients": [{}],
+            },
+        },
+    },
+)
+def test_packet_capture(bf_logger: TestLogger, device_manager: DeviceManager) -> None:
+    """Check that pings from LAN to WAN are captured on the board WAN interface.
+
+    :param bf_logger: bf_logger instance
+    :type bf_logger: TestLogger
+    :param device_manager: device manager instance
+    :type device_manager: DeviceManager
+    """
+    board = device_manager.get_device_by_type(
+        OpenWRT,  # type: ignore[type-abstract]
+    )
+    lan = device_manager.get_device_by_type(LAN)  # type: ignore[type-abstract]
+    wan = device_manager.get_device_by_type(WAN)  # type: ignore[type-abstract]
+    wan_ip = wan.get_interface_ipv4addr(wan.iface_dut)
+    bf_logger.log_step("Step1: Start ICMP echo capture on the board WAN interface")
+    with capture_packets(
+        board,
+        board.wan_iface,
+        bpf_filter=f"icmp[icmptype] = icmp-echo and host {wan_ip}",
+        packet_count=_PING_COUNT,
+    ) as capture:
+        bf_logger.log_step("Step2: Perform ping from lan to wan")
+        assert ping(lan, wan, ping_count=_PING_COUNT, ping_interface=lan.iface_dut)
+        bf_logger.log_step("Step3: Check the echo requests were captured")
+        assert len(list(capture.packets(timeout=10))) == _PING_COUNT
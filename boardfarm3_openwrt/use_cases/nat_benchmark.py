@@ -0,0 +1,64 @@
+"""NAT connection-setup rate use cases."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from boardfarm3_openwrt.lib.nat_benchmark import (
+    NatBenchmarkResult,
+    NatConnectionBenchmark,
+)
+
+if TYPE_CHECKING:
+    from boardfarm3.templates.lan import LAN
+    from boardfarm3.templates.wan import WAN
+
+    from boardfarm3_openwrt.templates.openwrt.openwrt import OpenWRT
+
+
+def measure_nat_connection_rate(  # noqa: PLR0913
+    board: OpenWRT,
+    lan_clients: list[LAN],
+    wan: WAN,
+    protocol: str = "tcp",
+    start_rate: int = 100,
+    max_rate: int = 100_000,
+    step_duration: int = 10,
+    failure_threshold: float = 0.01,
+) -> NatBenchmarkResult:
+    """Measure how many new flows per second the board can NAT.
+
+    The LAN clients open new flows towards the WAN device with hping3, doubling
+    the offered rate until more than ``failure_threshold`` of the flows fail:
+    TCP flows whose SYN gets no reply, UDP flows without a board conntrack
+    entry. The board conntrack table size and CPU load are recorded per step.
+
+    :param board: OpenWRT device instance
+    :type board: OpenWRT
+    :param lan_clients: LAN clients generating the flows
+    :type lan_clients: list[LAN]
+    :param wan: WAN device the flows are sent to
+    :type wan: WAN
+    :param protocol: tcp or udp, defaults to "tcp"
+    :type protocol: str
+    :param start_rate: first offered rate in flows/s, defaults to 100
+    :type start_rate: int
+    :param max_rate: highest offered rate in flows/s, defaults to 100000
+    :type max_rate: int
+    :param step_duration: seconds each rate step lasts, defaults to 10
+    :type step_duration: int
+    :param failure_threshold: tolerated share of failed flows, defaults to 0.01
+    :type failure_threshold: float
+    :return: per step measurements and the connections/sec ceiling
+    :rtype: NatBenchmarkResult
+    """
+    return NatConnectionBenchmark(
+        [lan.console for lan in lan_clients],
+        board.hw.get_interactive_consoles()["console"],
+        wan.get_interface_ipv4addr(wan.iface_dut),
+        protocol=protocol,
+        start_rate=start_rate,
+        max_rate=max_rate,
+        step_duration=step_duration,
+        failure_threshold=failure_threshold,
+    ).run()
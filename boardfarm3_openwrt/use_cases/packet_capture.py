@@ -0,0 +1,63 @@
+"""Packet capture use cases."""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+from typing import TYPE_CHECKING
+
+from boardfarm3_openwrt.lib.packet_capture import PacketCapture
+
+if TYPE_CHECKING:
+    from collections.abc import Generator
+    from pathlib import Path
+
+    from boardfarm3_openwrt.templates.openwrt.openwrt import OpenWRT
+
+
+@contextmanager
+def capture_packets(  # noqa: PLR0913
+    board: OpenWRT,
+    interface: str,
+    bpf_filter: str = "",
+    packet_count: int | None = None,
+    snaplen: int = 0,
+    output_file: Path | None = None,
+) -> Generator[PacketCapture, None, None]:
+    """Capture packets on an OpenWRT interface while the context is active.
+
+    tcpdump runs on the board with the BPF filter applied on the device and
+    streams pcap over a dedicated SSH channel, so the console stays free and
+    packets can be asserted on while the capture is still running.
+
+    .. code-block:: python
+
+        with capture_packets(board, board.wan_iface, "udp port 53") as capture:
+            lan.nslookup("example.com")
+            assert capture.wait_for_packet(timeout=10)
+
+    :param board: OpenWRT device instance
+    :type board: OpenWRT
+    :param interface: interface to capture on, e.g. br-lan/br-wan
+    :type interface: str
+    :param bpf_filter: BPF filter expression, defaults to "" (everything)
+    :type bpf_filter: str
+    :param packet_count: stop after this many packets, defaults to None
+    :type packet_count: int | None
+    :param snaplen: bytes captured per packet, defaults to 0 (whole packet)
+    :type snaplen: int
+    :param output_file: local file receiving the raw pcap, defaults to None
+    :type output_file: Path | None
+    :yield: running packet capture
+    """
+    capture = PacketCapture(
+        board.hw,
+        interface,
+        bpf_filter=bpf_filter,
+        packet_count=packet_count,
+        snaplen=snaplen,
+        output_file=output_file,
+    ).start()
+    try:
+        yield capture
+    finally:
+        capture.stop()
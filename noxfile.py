@@ -30,3 +30,13 @@ def pylint(session: nox.Session) -> None:
     """
     session.install("--upgrade", ".", "pylint")
     session.run("pylint", "boardfarm3_openwrt")
+
+
+@nox.session(python=_PYTHON_VERSIONS)
+def test(session: nox.Session) -> None:
+    """Run the boardfarm-openwrt unit tests.
+
+    # noqa: DAR101
+    """
+    session.install("--upgrade", ".[test]")
+    session.run("pytest", "unittests")
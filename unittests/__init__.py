@@ -0,0 +1 @@
+"""Boardfarm OpenWRT unit tests."""
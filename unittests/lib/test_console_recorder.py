@@ -0,0 +1,99 @@
+"""Unit tests of the console session recording and replay."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import pytest
+
+from boardfarm3_openwrt.lib.console_recorder import RecordingConsole, ReplayConsole
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+
+class _FakeConsole:
+    """Console answering each command with a counter of its calls."""
+
+    def __init__(self) -> None:
+        """Initialize the fake console."""
+        self.calls: dict[str, int] = {}
+        self.closed = False
+
+    def execute_command(self, command: str, timeout: int = -1) -> str:  # noqa: ARG002
+        """Return the command along with its call count.
+
+        :param command: command to be executed
+        :type command: str
+        :param timeout: ignored
+        :type timeout: int
+        :return: fake command output
+        :rtype: str
+        """
+        self.calls[command] = self.calls.get(command, 0) + 1
+        return f"{command} #{self.calls[command]}"
+
+    def login_to_server(self, password: str | None = None) -> None:
+        """Accept any login.
+
+        :param password: ignored
+        :type password: str | None
+        """
+
+    def sendline(self, line: str) -> None:
+        """Unrecorded console API.
+
+        :param line: ignored
+        :type line: str
+        """
+
+    def close(self) -> None:
+        """Close the fake console."""
+        self.closed = True
+
+
+def test_record_replay_round_trip(tmp_path: Path) -> None:
+    """Check a replay answers the recorded outputs in order.
+
+    :param tmp_path: temporary directory
+    :type tmp_path: Path
+    """
+    fake = _FakeConsole()
+    recording_file = tmp_path / "console.jsonl.gz"
+    recorder = RecordingConsole(fake, recording_file)
+    recorder.login_to_server("root")
+    recorded = [recorder.execute_command(cmd) for cmd in ("uptime", "ls", "uptime")]
+    recorder.close()
+    assert fake.closed
+
+    replay = ReplayConsole(recording_file)
+    replay.login_to_server("root")
+    assert [replay.execute_command(cmd) for cmd in ("uptime", "ls", "uptime")] == (
+        recorded
+    )
+    with pytest.raises(ValueError, match="No recorded output left"):
+        replay.execute_command("uptime")
+    replay.close()
+
+
+def test_unrecorded_api(tmp_path: Path, caplog: pytest.LogCaptureFixture) -> None:
+    """Check unrecorded APIs are passed through when recording, refused on replay.
+
+    :param tmp_path: temporary directory
+    :type tmp_path: Path
+    :param caplog: log capture
+    :type caplog: pytest.LogCaptureFixture
+    """
+    recording_file = tmp_path / "console.jsonl.gz"
+    fake = _FakeConsole()
+    recorder = RecordingConsole(fake, recording_file)
+    recorder.sendline("reboot")
+    recorder.sendline("reboot")
+    assert caplog.text.count("cannot be replayed") == 1
+    with pytest.raises(AttributeError):
+        recorder._private  # noqa: B018, SLF001  # pylint: disable=protected-access
+    recorder.close()
+    replay = ReplayConsole(recording_file)
+    for name in ("sendline", "expect", "get_last_output", "interactive"):
+        with pytest.raises(AttributeError, match="not replayable"):
+            getattr(replay, name)
@@ -0,0 +1,259 @@
+"""Unit tests of the streamed tar file transfer, the device being local."""
+
+from __future__ import annotations
+
+import hashlib
+import shutil
+import subprocess
+from typing import IO, TYPE_CHECKING
+
+import pytest
+from boardfarm3.exceptions import DeviceConnectionError
+
+from boardfarm3_openwrt.lib.file_transfer import (
+    _local_destination,
+    parse_md5sum_output,
+    pull_files,
+    push_files,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from pathlib import Path
+
+pytestmark = pytest.mark.skipif(
+    not all(map(shutil.which, ("find", "md5sum", "tar", "wc"))),
+    reason="needs find, md5sum, tar and wc",
+)
+
+
+class _LocalChannel:
+    """Channel running the device command in a local shell."""
+
+    def __init__(self, command: str, with_stdin: bool) -> None:
+        """Start the command.
+
+        :param command: device command
+        :type command: str
+        :param with_stdin: open a pipe to the command stdin
+        :type with_stdin: bool
+        """
+        self._command = command
+        self._process = subprocess.Popen(  # noqa: S603
+            ["sh", "-c", command],  # noqa: S607
+            stdin=subprocess.PIPE if with_stdin else subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+        )
+
+    @property
+    def stdin(self) -> IO[bytes]:
+        """Command standard input.
+
+        :return: byte stream of the command input
+        :rtype: IO[bytes]
+        """
+        return self._process.stdin
+
+    @property
+    def stdout(self) -> IO[bytes]:
+        """Command standard output.
+
+        :return: byte stream of the command output
+        :rtype: IO[bytes]
+        """
+        return self._process.stdout
+
+    def wait(self) -> int:
+        """Wait for the command, closing stdin if data was piped in.
+
+        :raises DeviceConnectionError: when the command exits with an error
+        :return: exit status of the command
+        :rtype: int
+        """
+        if self._process.stdin is not None and not self._process.stdin.closed:
+            self._process.stdin.close()
+        if returncode := self._process.wait():
+            err_msg = f"'{self._command}' failed"
+            raise DeviceConnectionError(err_msg)
+        return returncode
+
+    def close(self) -> None:
+        """Wait for the command and release the pipes."""
+        for pipe in (self._process.stdin, self._process.stdout):
+            if pipe is not None and not pipe.closed:
+                pipe.close()
+        self._process.wait()
+
+
+class _LocalHardware:
+    """Hardware whose SSH channels run locally, optionally altering commands."""
+
+    def __init__(self, rewrite: Callable[[str], str] | None = None) -> None:
+        """Initialize the local hardware.
+
+        :param rewrite: command rewriter, defaults to None
+        :type rewrite: Callable[[str], str] | None
+        """
+        self._rewrite = rewrite
+        self.commands: list[str] = []
+
+    def open_ssh_channel(self, command: str, with_stdin: bool = False) -> _LocalChannel:
+        """Run the command locally.
+
+        :param command: device command
+        :type command: str
+        :param with_stdin: open a pipe to the command stdin, defaults to False
+        :type with_stdin: bool
+        :return: local channel
+        :rtype: _LocalChannel
+        """
+        if self._rewrite is not None:
+            command = self._rewrite(command)
+        self.commands.append(command)
+        return _LocalChannel(command, with_stdin)
+
+
+@pytest.fixture(name="source")
+def source_fixture(tmp_path: Path) -> Path:
+    """Local directory to be pushed.
+
+    :param tmp_path: temporary directory
+    :type tmp_path: Path
+    :return: directory with nested files
+    :rtype: Path
+    """
+    source = tmp_path / "source"
+    (source / "sub dir").mkdir(parents=True)
+    (source / "a.txt").write_bytes(b"a" * 100_000)
+    (source / "sub dir" / "b.bin").write_bytes(bytes(range(256)))
+    return source
+
+
+@pytest.mark.parametrize("compress", [True, False])
+def test_push_pull_round_trip(tmp_path: Path, source: Path, compress: bool) -> None:
+    """Check pushed then pulled files keep their content and are not resent.
+
+    :param tmp_path: temporary directory
+    :type tmp_path: Path
+    :param source: local directory to be pushed
+    :type source: Path
+    :param compress: gzip the stream
+    :type compress: bool
+    """
+    hardware = _LocalHardware()
+    device_dir = (tmp_path / "device").as_posix()
+    pushed = push_files(hardware, [source], device_dir, compress)
+    assert sorted(pushed) == [
+        f"{device_dir}/source/a.txt",
+        f"{device_dir}/source/sub dir/b.bin",
+    ]
+    # the manifests list the pushed roots, not each file
+    assert all("a.txt" not in command for command in hardware.commands)
+
+    local_dir = tmp_path / "local"
+    pulled = pull_files(hardware, [device_dir], local_dir, compress)
+    assert sorted(path.read_bytes() for path in pulled) == sorted(
+        path.read_bytes() for path in source.rglob("*") if path.is_file()
+    )
+    assert all(path.is_relative_to(local_dir.resolve()) for path in pulled)
+
+
+def test_skip_up_to_date(tmp_path: Path, source: Path) -> None:
+    """Check only the changed files are transferred again.
+
+    :param tmp_path: temporary directory
+    :type tmp_path: Path
+    :param source: local directory to be pushed
+    :type source: Path
+    """
+    hardware = _LocalHardware()
+    device_dir = (tmp_path / "device").as_posix()
+    local_dir = tmp_path / "local"
+    push_files(hardware, [source], device_dir)
+    pull_files(hardware, [device_dir], local_dir)
+    assert push_files(hardware, [source], device_dir) == []
+    assert pull_files(hardware, [device_dir], local_dir) == []
+
+    (source / "a.txt").write_bytes(b"changed")
+    assert push_files(hardware, [source], device_dir) == [
+        f"{device_dir}/source/a.txt",
+    ]
+    (pulled,) = pull_files(hardware, [device_dir], local_dir)
+    assert pulled.read_bytes() == b"changed"
+
+
+def test_push_integrity_mismatch(tmp_path: Path, source: Path) -> None:
+    """Check a file altered on the device while pushed is reported.
+
+    :param tmp_path: temporary directory
+    :type tmp_path: Path
+    :param source: local directory to be pushed
+    :type source: Path
+    """
+    device_dir = (tmp_path / "device").as_posix()
+    corrupted = f"{device_dir}/source/a.txt"
+
+    def corrupt(command: str) -> str:
+        if command.startswith("mkdir"):
+            return f"{command} && echo corrupt >> '{corrupted}'"
+        return command
+
+    with pytest.raises(DeviceConnectionError, match=r"pushed files: .*a\.txt"):
+        push_files(_LocalHardware(corrupt), [source], device_dir)
+
+
+def test_pull_integrity_mismatch(tmp_path: Path, source: Path) -> None:
+    """Check a file changed after the manifest is pulled, then reported.
+
+    :param tmp_path: temporary directory
+    :type tmp_path: Path
+    :param source: directory standing for the device files
+    :type source: Path
+    """
+    grown = source / "a.txt"
+
+    def grow(command: str) -> str:
+        if command.startswith("tar"):
+            return f"echo grown >> '{grown}'; {command}"
+        return command
+
+    local_dir = tmp_path / "local"
+    with pytest.raises(DeviceConnectionError, match=r"pulled files: .*a\.txt"):
+        pull_files(_LocalHardware(grow), [source.as_posix()], local_dir)
+    # the other files of the stream are still pulled
+    assert _local_destination(local_dir, f"{source}/sub dir/b.bin").is_file()
+    assert (
+        _local_destination(local_dir, grown.as_posix())
+        .read_bytes()
+        .endswith(
+            b"grown\n",
+        )
+    )
+
+
+def test_local_destination(tmp_path: Path) -> None:
+    """Check device paths are mirrored and cannot escape the directory.
+
+    :param tmp_path: temporary directory
+    :type tmp_path: Path
+    """
+    assert _local_destination(tmp_path, "/etc/config/network") == (
+        tmp_path.resolve() / "etc" / "config" / "network"
+    )
+    with pytest.raises(ValueError, match="outside"):
+        _local_destination(tmp_path, "/../etc/passwd")
+
+
+def test_parse_md5sum_output() -> None:
+    """Check md5sum lines are parsed and console noise is skipped."""
+    digest = hashlib.md5(b"").hexdigest()  # noqa: S324
+    output = (
+        "find /etc/config -type f -exec md5sum {} +\r\n"
+        f"{digest}  /etc/config/network\r\n"
+        f"{digest}  /etc/config/file with spaces\n"
+        "md5sum: /etc/config/broken: Permission denied\n"
+    )
+    assert parse_md5sum_output(output) == {
+        "/etc/config/network": digest,
+        "/etc/config/file with spaces": digest,
+    }
@@ -0,0 +1,105 @@
+"""Unit tests of the system log follower."""
+
+import shlex
+import shutil
+import subprocess
+import threading
+
+import pytest
+
+from boardfarm3_openwrt.lib.log_follower import LogFollower, build_logread_command
+from boardfarm3_openwrt.lib.records import LogEntry
+
+_STARTED = "Mon Oct 19 10:00:00 2026 [1792404000.250] daemon.info dnsmasq[12]: started"
+
+
+@pytest.fixture(name="follower")
+def follower_fixture() -> LogFollower:
+    """Follower whose buffer is fed by the test instead of a device.
+
+    :return: log follower, marked as running
+    :rtype: LogFollower
+    """
+    follower = LogFollower(hardware=None)
+    follower._running = True  # noqa: SLF001  # pylint: disable=protected-access
+    return follower
+
+
+def _append(follower: LogFollower, line: str) -> None:
+    """Feed a logread line to the follower.
+
+    :param follower: log follower
+    :type follower: LogFollower
+    :param line: logread line
+    :type line: str
+    """
+    entry = LogEntry.from_logread(line)
+    follower._append(entry)  # noqa: SLF001  # pylint: disable=protected-access
+
+
+def test_build_logread_command() -> None:
+    """Check entries are printed with their epoch timestamp."""
+    assert build_logread_command() == "logread -f -t"
+    assert build_logread_command(["dnsmasq"], "err").startswith("logread -f -t | awk")
+
+
+@pytest.mark.skipif(not shutil.which("awk"), reason="needs awk")
+def test_build_logread_command_daemon_filter() -> None:
+    """Check daemon names are matched literally by the POSIX awk regex."""
+    command = build_logread_command(["ntp-client", "odhcp6c.sh"])
+    assert "ntp-client" in command
+    assert "odhcp6c\\.sh" in command
+    lines = (
+        "Mon Oct 19 10:00:00 2026 [1.0] daemon.info ntp-client[3]: synced",
+        "Mon Oct 19 10:00:00 2026 [1.0] daemon.info odhcp6c.sh: bound",
+        "Mon Oct 19 10:00:00 2026 [1.0] daemon.info odhcp6cXsh: bound",
+        "Mon Oct 19 10:00:00 2026 [1.0] daemon.info dnsmasq[12]: started",
+    )
+    awk = subprocess.run(  # noqa: S603
+        ["awk", shlex.split(command.split("| awk ", 1)[1])[0]],  # noqa: S607
+        input="\n".join(lines) + "\n",
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert awk.stdout.splitlines() == list(lines[:2])
+
+
+def test_from_logread_epoch_timestamp() -> None:
+    """Check the logread -t timestamp is preferred over the date."""
+    entry = LogEntry.from_logread(_STARTED)
+    assert entry.timestamp == 1792404000.25  # noqa: PLR2004
+    assert entry.source == "dnsmasq"
+    assert entry.message == "started"
+
+
+def test_wait_for_log_skips_replayed_entries(follower: LogFollower) -> None:
+    """Check entries buffered before the wait do not match by default.
+
+    :param follower: log follower
+    :type follower: LogFollower
+    """
+    _append(follower, _STARTED)
+    timer = threading.Timer(0.1, _append, (follower, _STARTED.replace("250", "500")))
+    timer.start()
+    try:
+        entry = follower.wait_for_log("started", timeout=5)
+    finally:
+        timer.join()
+    assert entry.timestamp == 1792404000.5  # noqa: PLR2004
+
+
+def test_wait_for_log_since_mark(follower: LogFollower) -> None:
+    """Check entries which arrived after a mark match without waiting.
+
+    :param follower: log follower
+    :type follower: LogFollower
+    """
+    _append(follower, _STARTED)
+    mark = follower.mark()
+    with pytest.raises(TimeoutError):
+        follower.wait_for_log("started", timeout=0.1, since_mark=mark)
+    _append(follower, _STARTED.replace("250", "500"))
+    replayed, new = follower.get_entries()
+    assert follower.wait_for_log("started", timeout=0, since_mark=mark) == new
+    assert follower.wait_for_log("started", timeout=0, since_mark=0) == replayed
@@ -0,0 +1,119 @@
+"""Run the NAT benchmark against fake consoles and the netns stand-ins."""
+
+import os
+import re
+import shutil
+
+import pytest
+
+from boardfarm3_openwrt.lib.nat_benchmark import NatConnectionBenchmark
+from boardfarm3_openwrt.lib.netns import NetnsTopology
+
+_STEP_RATES = [50, 100, 200]
+_STEP_DURATION = 2
+# flows of a step the fake DUT can NAT
+_NAT_CAPACITY = 150
+
+
+class _FakeLanConsole:
+    """LAN client whose hping3 only gets replies from TCP probes."""
+
+    def execute_command(self, command: str, timeout: int = -1) -> str:  # noqa: ARG002
+        """Answer the hping3 command with its statistics lines.
+
+        :param command: hping3 command
+        :type command: str
+        :param timeout: ignored
+        :type timeout: int
+        :return: hping3 statistics
+        :rtype: str
+        """
+        count = int(re.search(r"-c (\d+)", command).group(1))
+        # UDP probes only get rate limited ICMP port unreachable replies
+        received = 6 if "--udp" in command else min(count, _NAT_CAPACITY // 2)
+        return (
+            f"--- 10.64.0.2 hping statistic ---\r\n"
+            f"{count} packets transmitted, {received} packets received, 0% loss"
+        )
+
+
+class _FakeDutConsole:
+    """DUT creating conntrack entries up to its NAT capacity per step."""
+
+    def __init__(self) -> None:
+        """Initialize the fake DUT console."""
+        self.commands: list[str] = []
+
+    def execute_command(self, command: str, timeout: int = -1) -> str:  # noqa: ARG002
+        """Answer the CPU, conntrack size and UDP flow count commands.
+
+        :param command: DUT command
+        :type command: str
+        :param timeout: ignored
+        :type timeout: int
+        :return: command output
+        :rtype: str
+        """
+        self.commands.append(command)
+        if command.startswith("head"):
+            return "cpu  100 0 100 800 0 0 0 0 0 0"
+        if "grep -c" in command:
+            return str(_NAT_CAPACITY)
+        return "0\r\n65536"
+
+
+@pytest.mark.parametrize("protocol", ["tcp", "udp"])
+def test_nat_benchmark_counts_flows(protocol: str) -> None:
+    """Check UDP flows are counted from the DUT conntrack, TCP ones from replies.
+
+    :param protocol: tcp or udp
+    :type protocol: str
+    """
+    dut_console = _FakeDutConsole()
+    result = NatConnectionBenchmark(
+        [_FakeLanConsole(), _FakeLanConsole()],
+        dut_console,
+        "10.64.0.2",
+        protocol=protocol,
+        start_rate=_STEP_RATES[0],
+        max_rate=_STEP_RATES[-1],
+        step_duration=_STEP_DURATION,
+    ).run()
+    # the second step offers 200 flows, above the DUT capacity
+    assert [step.established for step in result.steps] == [100, _NAT_CAPACITY]
+    assert result.passing_steps == result.steps[:1]
+    assert any("dport=80 " in command for command in dut_console.commands) == (
+        protocol == "udp"
+    )
+
+
+@pytest.mark.skipif(
+    os.geteuid() != 0 or not all(map(shutil.which, ("ip", "iptables", "hping3"))),
+    reason="needs root, iproute2, iptables and hping3",
+)
+@pytest.mark.parametrize("protocol", ["tcp", "udp"])
+def test_nat_benchmark_on_netns(protocol: str) -> None:
+    """Check each rate step creates NAT flows through the DUT namespace.
+
+    :param protocol: tcp or udp
+    :type protocol: str
+    """
+    if protocol == "udp" and not shutil.which("conntrack"):
+        pytest.skip("UDP flows are counted with conntrack")
+    with NetnsTopology(lan_clients=2, prefix="bfut") as topology:
+        result = NatConnectionBenchmark(
+            topology.lan_consoles,
+            topology.dut_console,
+            topology.wan_ip,
+            protocol=protocol,
+            start_rate=_STEP_RATES[0],
+            max_rate=_STEP_RATES[-1],
+            step_duration=_STEP_DURATION,
+            drain_timeout=60,
+        ).run()
+    assert [step.offered_rate for step in result.steps] == _STEP_RATES
+    for step in result.steps:
+        assert step.attempted == step.offered_rate * _STEP_DURATION
+        assert step.failure_ratio <= result.failure_threshold
+        assert step.conntrack_count >= step.established
+    assert result.max_connection_rate > 0
@@ -0,0 +1,169 @@
+"""Unit tests of the streaming packet capture."""
+
+from __future__ import annotations
+
+import os
+import threading
+from typing import IO, TYPE_CHECKING
+
+import pytest
+from boardfarm3.exceptions import DeviceConnectionError
+
+from boardfarm3_openwrt.lib.packet_capture import PacketCapture
+from unittests.lib.test_pcap import build_pcap
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+
+class _FakeChannel:
+    """Channel streaming a pipe, written by the test, as tcpdump stdout."""
+
+    def __init__(self, listening: bool = True) -> None:
+        """Initialize the fake channel.
+
+        :param listening: tcpdump reports it is listening, defaults to True
+        :type listening: bool
+        """
+        read_fd, write_fd = os.pipe()
+        self.stdout: IO[bytes] = os.fdopen(read_fd, "rb")
+        self.writer: IO[bytes] = os.fdopen(write_fd, "wb", buffering=0)
+        self.listening = listening
+        self.stderr = "" if listening else "tcpdump: eth9: No such device exists"
+        self.is_running = True
+        self.closed = False
+
+    def wait_for_stderr(self, pattern: str, timeout: float) -> bool:  # noqa: ARG002
+        """Report whether tcpdump printed its listening line.
+
+        :param pattern: ignored
+        :type pattern: str
+        :param timeout: ignored
+        :type timeout: float
+        :return: True if listening
+        :rtype: bool
+        """
+        return self.listening
+
+    def terminate(self) -> None:
+        """End the tcpdump stream."""
+        self.is_running = False
+        if not self.writer.closed:
+            self.writer.close()
+
+    def wait(self) -> None:
+        """Nothing to wait for, tcpdump exits successfully."""
+
+    def close(self) -> None:
+        """Close the channel."""
+        self.terminate()
+        self.stdout.close()
+        self.closed = True
+
+
+class _FakeHardware:
+    """Hardware handing out a single fake channel."""
+
+    def __init__(self, channel: _FakeChannel) -> None:
+        """Initialize the fake hardware.
+
+        :param channel: channel returned by open_ssh_channel
+        :type channel: _FakeChannel
+        """
+        self.channel = channel
+        self.commands: list[str] = []
+
+    def open_ssh_channel(self, command: str) -> _FakeChannel:
+        """Record the command and return the fake channel.
+
+        :param command: device command
+        :type command: str
+        :return: fake channel
+        :rtype: _FakeChannel
+        """
+        self.commands.append(command)
+        return self.channel
+
+
+@pytest.fixture(name="channel")
+def channel_fixture() -> Iterator[_FakeChannel]:
+    """Fake tcpdump channel, closed after the test.
+
+    :yield: fake channel
+    """
+    channel = _FakeChannel()
+    yield channel
+    channel.close()
+
+
+def test_command(channel: _FakeChannel) -> None:
+    """Check the filter is quoted and the packet count passed to tcpdump.
+
+    :param channel: fake tcpdump channel
+    :type channel: _FakeChannel
+    """
+    capture = PacketCapture(
+        _FakeHardware(channel),
+        "br-wan",
+        bpf_filter="icmp and host 10.0.0.1",
+        packet_count=4,
+    )
+    assert capture.command == (
+        "tcpdump -i br-wan -U -w - -s 0 -c 4 'icmp and host 10.0.0.1'"
+    )
+
+
+def test_start_not_listening() -> None:
+    """Check a tcpdump failing to start raises with its error message."""
+    channel = _FakeChannel(listening=False)
+    capture = PacketCapture(_FakeHardware(channel), "eth9")
+    with pytest.raises(DeviceConnectionError, match="No such device"):
+        capture.start(timeout=0)
+    assert channel.closed
+
+
+def test_packets_until_end_of_stream(channel: _FakeChannel) -> None:
+    """Check packets are yielded until tcpdump exits.
+
+    :param channel: fake tcpdump channel
+    :type channel: _FakeChannel
+    """
+    capture = PacketCapture(_FakeHardware(channel), "br-wan").start()
+    channel.writer.write(build_pcap((b"a" * 60, b"b" * 60)))
+    channel.terminate()
+    assert [packet.data for packet in capture.packets(timeout=5)] == [
+        b"a" * 60,
+        b"b" * 60,
+    ]
+    assert list(capture.packets(timeout=5)) == []
+    capture.stop()
+
+
+def test_packets_timeout(channel: _FakeChannel) -> None:
+    """Check the packets generator ends when the stream stalls.
+
+    :param channel: fake tcpdump channel
+    :type channel: _FakeChannel
+    """
+    capture = PacketCapture(_FakeHardware(channel), "br-wan").start()
+    channel.writer.write(build_pcap((b"a" * 60,)))
+    assert len(list(capture.packets(timeout=0.2))) == 1
+    capture.stop()
+
+
+def test_wait_for_packet(channel: _FakeChannel) -> None:
+    """Check the predicate selects the packet and a stalled stream times out.
+
+    :param channel: fake tcpdump channel
+    :type channel: _FakeChannel
+    """
+    capture = PacketCapture(_FakeHardware(channel), "br-wan").start()
+    stream = build_pcap((b"a" * 60, b"b" * 60))
+    timer = threading.Timer(0.1, channel.writer.write, (stream,))
+    timer.start()
+    packet = capture.wait_for_packet(5, lambda packet: packet.data[0] == ord("b"))
+    timer.join()
+    assert packet.timestamp == 1.5  # noqa: PLR2004
+    with pytest.raises(TimeoutError):
+        capture.wait_for_packet(0.2)
+    capture.stop()
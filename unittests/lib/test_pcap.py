@@ -0,0 +1,85 @@
+"""Unit tests of the incremental pcap stream parser."""
+
+import struct
+
+import pytest
+
+from boardfarm3_openwrt.lib.pcap import PcapStreamParser
+
+_LINKTYPE_ETHERNET = 1
+_PACKETS = (b"\x01" * 60, b"\x02" * 1500, b"")
+
+
+def build_pcap(
+    packets: tuple[bytes, ...],
+    byte_order: str = "<",
+    nanosecond: bool = False,
+) -> bytes:
+    """Build a pcap stream like ``tcpdump -w -`` writes it.
+
+    :param packets: packet contents, packet N is timestamped N.5 seconds
+    :type packets: tuple[bytes, ...]
+    :param byte_order: struct byte order of the writer, defaults to "<"
+    :type byte_order: str
+    :param nanosecond: nanosecond timestamps, defaults to False
+    :type nanosecond: bool
+    :return: pcap stream
+    :rtype: bytes
+    """
+    magic = 0xA1B23C4D if nanosecond else 0xA1B2C3D4
+    divisor = 1_000_000_000 if nanosecond else 1_000_000
+    stream = struct.pack(
+        f"{byte_order}IHHiIII",
+        magic,
+        2,
+        4,
+        0,
+        0,
+        65535,
+        _LINKTYPE_ETHERNET,
+    )
+    for idx, packet in enumerate(packets):
+        stream += struct.pack(
+            f"{byte_order}IIII",
+            idx,
+            divisor // 2,
+            len(packet),
+            len(packet) + 4,
+        )
+        stream += packet
+    return stream
+
+
+@pytest.mark.parametrize("byte_order", ["<", ">"])
+@pytest.mark.parametrize("nanosecond", [False, True])
+def test_feed_whole_stream(byte_order: str, nanosecond: bool) -> None:
+    """Check both byte orders and timestamp resolutions are parsed.
+
+    :param byte_order: struct byte order of the writer
+    :type byte_order: str
+    :param nanosecond: nanosecond timestamps
+    :type nanosecond: bool
+    """
+    parser = PcapStreamParser()
+    packets = list(parser.feed(build_pcap(_PACKETS, byte_order, nanosecond)))
+    assert [packet.data for packet in packets] == list(_PACKETS)
+    assert [packet.timestamp for packet in packets] == [0.5, 1.5, 2.5]
+    assert [packet.original_length for packet in packets] == [64, 1504, 4]
+    assert parser.link_type == _LINKTYPE_ETHERNET
+
+
+def test_feed_byte_by_byte() -> None:
+    """Check packets split at any chunk boundary are reassembled."""
+    parser = PcapStreamParser()
+    stream = build_pcap(_PACKETS)
+    packets = []
+    for idx in range(len(stream)):
+        packets += parser.feed(stream[idx : idx + 1])
+    assert [packet.data for packet in packets] == list(_PACKETS)
+
+
+def test_feed_bad_magic() -> None:
+    """Check a stream which is not pcap is rejected."""
+    parser = PcapStreamParser()
+    with pytest.raises(ValueError, match="unknown magic number"):
+        list(parser.feed(b"tcpdump: eth9: No such device exists\n" * 2))
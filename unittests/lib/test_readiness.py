@@ -0,0 +1,97 @@
+"""Unit tests of the readiness probes."""
+
+import asyncio
+import re
+
+import pytest
+from boardfarm3.exceptions import DeviceBootFailure
+
+from boardfarm3_openwrt.lib.readiness import (
+    DefaultRouteProbe,
+    InterfaceProbe,
+    ReadinessChecker,
+    ServiceProbe,
+    parse_probes,
+)
+
+
+class _FakeConsole:
+    """Console failing the probes for a number of polls."""
+
+    def __init__(self, failing_polls: int) -> None:
+        """Initialize the fake console.
+
+        :param failing_polls: number of polls before the probes pass
+        :type failing_polls: int
+        """
+        self.failing_polls = failing_polls
+        self.polls = 0
+
+    def execute_command(self, command: str, timeout: int = -1) -> str:  # noqa: ARG002
+        """Answer the batched probe command.
+
+        :param command: batched probe command
+        :type command: str
+        :param timeout: ignored
+        :type timeout: int
+        :return: probe marker lines
+        :rtype: str
+        """
+        self.polls += 1
+        result = "fail" if self.polls <= self.failing_polls else "ok"
+        return "\r\n".join(
+            f"__probe_{idx}:{result}"
+            for idx in re.findall(r"echo __probe_(\d+):ok", command)
+        )
+
+
+def test_parse_probes() -> None:
+    """Check probes are built from their device config description."""
+    assert parse_probes(
+        [
+            {"type": "interface", "interface": "br-lan", "ipv6": True},
+            {"type": "service", "service": "dnsmasq"},
+            {"type": "default_route"},
+        ],
+    ) == [
+        InterfaceProbe("br-lan", ipv6=True),
+        ServiceProbe("dnsmasq"),
+        DefaultRouteProbe(),
+    ]
+
+
+@pytest.mark.parametrize(
+    "probe_config",
+    [{"type": "wan"}, {"interface": "br-lan"}, {"type": "service"}],
+)
+def test_parse_probes_invalid(probe_config: dict) -> None:
+    """Check unknown probe types and missing fields are rejected.
+
+    :param probe_config: invalid probe description
+    :type probe_config: dict
+    """
+    with pytest.raises(ValueError, match="readiness probe"):
+        parse_probes([probe_config])
+
+
+def test_wait_polls_until_ready() -> None:
+    """Check the blocking and async waits poll until the probes pass."""
+    probes = [InterfaceProbe("br-lan"), ServiceProbe("network")]
+    for wait in (
+        lambda checker: checker.wait(10),
+        lambda checker: asyncio.run(checker.wait_async(10)),
+    ):
+        console = _FakeConsole(failing_polls=2)
+        wait(ReadinessChecker(console, probes, initial_interval=0.01))
+        assert console.polls == 3  # noqa: PLR2004
+
+
+def test_wait_timeout() -> None:
+    """Check the failing probes are reported once the deadline expired."""
+    checker = ReadinessChecker(
+        _FakeConsole(failing_polls=1000),
+        [ServiceProbe("odhcpd")],
+        initial_interval=0.01,
+    )
+    with pytest.raises(DeviceBootFailure, match="service odhcpd"):
+        checker.wait(0.1)
@@ -0,0 +1,102 @@
+"""Unit tests of the parsed device state records."""
+
+import copy
+import pickle
+from ipaddress import ip_address, ip_interface, ip_network
+
+import pytest
+
+from boardfarm3_openwrt.lib.records import Interface, Route
+
+# console output, with the \r\n line endings of the pexpect console
+_BUSYBOX_IFCONFIG = (
+    "br-lan    Link encap:Ethernet  HWaddr 00:11:22:AA:BB:CC  \r\n"
+    "          inet addr:192.168.1.1  Bcast:192.168.1.255  Mask:255.255.255.0\r\n"
+    "          inet6 addr: fe80::211:22ff:feaa:bbcc/64 Scope:Link\r\n"
+    "          inet6 addr: fd12:3456:789a::1/60 Scope:Global\r\n"
+    "          UP BROADCAST RUNNING MULTICAST  MTU:1500  Metric:1\r\n"
+    "          RX packets:1200 errors:0 dropped:0 overruns:0 frame:0\r\n"
+)
+_NET_TOOLS_IFCONFIG = (
+    "eth0: flags=4163<UP,BROADCAST,RUNNING,MULTICAST>  mtu 1500\r\n"
+    "        inet 10.0.0.2  netmask 255.255.255.0  broadcast 10.0.0.255\r\n"
+    "        inet6 fe80::211:22ff:feaa:bbcc  prefixlen 64  scopeid 0x20<link>\r\n"
+    "        inet6 2001:db8::2  prefixlen 64  scopeid 0x0<global>\r\n"
+    "        ether 00:11:22:aa:bb:cc  txqueuelen 1000  (Ethernet)\r\n"
+)
+_IP_ROUTE = (
+    "default proto static metric 10\r\n"
+    "\tnexthop via 10.0.0.1 dev eth0 weight 1\r\n"
+    "\tnexthop via 10.0.1.1 dev eth1 weight 1\r\n"
+    "blackhole 10.1.0.0/16 proto static\r\n"
+    "prohibit 10.2.0.0/16 proto static\r\n"
+    "throw 10.3.0.0/16 proto static\r\n"
+    "unreachable 10.4.0.0/16 proto static metric 5\r\n"
+    "10.0.0.0/24 dev eth0 proto kernel scope link src 10.0.0.2\r\n"
+    "192.168.2.0/24 via inet6 fe80::1 dev eth0 table 100\r\n"
+)
+
+
+@pytest.mark.parametrize(
+    ("output", "name"),
+    [(_BUSYBOX_IFCONFIG, "br-lan"), (_NET_TOOLS_IFCONFIG, "eth0")],
+)
+def test_from_ifconfig(output: str, name: str) -> None:
+    """Check the link state and the address scopes are parsed.
+
+    :param output: ifconfig output
+    :type output: str
+    :param name: interface name
+    :type name: str
+    """
+    interface = Interface.from_ifconfig(name, output)
+    assert interface.mac == "00:11:22:aa:bb:cc"
+    assert interface.is_up
+    assert interface.mtu == 1500  # noqa: PLR2004
+    assert len(interface.get_addresses(4)) == 1
+    link_local, global_address = interface.get_addresses(6)
+    assert link_local.interface == ip_interface("fe80::211:22ff:feaa:bbcc/64")
+    assert link_local.scope == "link"
+    assert global_address.scope == "global"
+
+
+def test_records_pickle_and_deepcopy() -> None:
+    """Check frozen slotted records survive pickle and deepcopy."""
+    interface = Interface.from_ifconfig("br-lan", _BUSYBOX_IFCONFIG)
+    assert pickle.loads(pickle.dumps(interface)) == interface  # noqa: S301
+    assert copy.deepcopy(interface) == interface
+    assert hash(copy.deepcopy(interface)) == hash(interface)
+
+
+def test_from_ip_route_output() -> None:
+    """Check every route type is parsed and nexthop lines are folded."""
+    routes = Route.from_ip_route_output(_IP_ROUTE)
+    assert [route.route_type for route in routes] == [
+        "unicast",
+        "blackhole",
+        "prohibit",
+        "throw",
+        "unreachable",
+        "unicast",
+        "unicast",
+    ]
+    multipath = routes[0]
+    assert multipath.destination == ip_network("0.0.0.0/0")
+    assert multipath.gateway is None
+    assert multipath.metric == 10  # noqa: PLR2004
+    assert multipath.nexthops == (
+        (ip_address("10.0.0.1"), "eth0"),
+        (ip_address("10.0.1.1"), "eth1"),
+    )
+    assert routes[1].destination == ip_network("10.1.0.0/16")
+    assert routes[4].metric == 5  # noqa: PLR2004
+    assert routes[5].gateway is None
+    assert routes[5].table == "main"
+    assert routes[6].gateway == ip_address("fe80::1")
+    assert routes[6].table == "100"
+
+
+def test_from_ip_route_rejects_lone_nexthop() -> None:
+    """Check a nexthop line without its route is not taken for a route."""
+    with pytest.raises(ValueError, match="Not a route line"):
+        Route.from_ip_route("nexthop via 10.0.0.1 dev eth0 weight 1")
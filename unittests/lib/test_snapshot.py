@@ -0,0 +1,109 @@
+"""Unit tests of the configuration snapshot helpers."""
+
+import hashlib
+import io
+import tarfile
+
+import pytest
+
+from boardfarm3_openwrt.lib.snapshot import ConfigSnapshot, get_reload_commands
+
+_FILES = {
+    "etc/config/network": b"config interface 'lan'\n",
+    "etc/config/dhcp": b"config dnsmasq\n",
+}
+
+
+def _md5(content: bytes) -> str:
+    """Return the MD5 hex digest of a content.
+
+    :param content: file content
+    :type content: bytes
+    :return: MD5 hex digest
+    :rtype: str
+    """
+    return hashlib.md5(content).hexdigest()  # noqa: S324
+
+
+def _build_archive(files: dict[str, bytes]) -> bytes:
+    """Build a gzipped tar like ``tar -czf - -C / etc/config`` does.
+
+    :param files: archive name -> content
+    :type files: dict[str, bytes]
+    :return: gzipped tar archive
+    :rtype: bytes
+    """
+    output = io.BytesIO()
+    with tarfile.open(fileobj=output, mode="w:gz") as tar:
+        for name, content in files.items():
+            info = tarfile.TarInfo(f"./{name}")
+            info.size = len(content)
+            tar.addfile(info, io.BytesIO(content))
+    return output.getvalue()
+
+
+@pytest.fixture(name="snapshot")
+def snapshot_fixture() -> ConfigSnapshot:
+    """Snapshot of a small /etc/config.
+
+    :return: configuration snapshot
+    :rtype: ConfigSnapshot
+    """
+    return ConfigSnapshot.from_archive(("/etc/config",), _build_archive(_FILES))
+
+
+def test_from_archive_digests(snapshot: ConfigSnapshot) -> None:
+    """Check the archive members are indexed by absolute device path.
+
+    :param snapshot: configuration snapshot
+    :type snapshot: ConfigSnapshot
+    """
+    assert snapshot.digests == {
+        f"/{name}": _md5(content) for name, content in _FILES.items()
+    }
+
+
+def test_changed_and_added_files(snapshot: ConfigSnapshot) -> None:
+    """Check modified, deleted and new device files are told apart.
+
+    :param snapshot: configuration snapshot
+    :type snapshot: ConfigSnapshot
+    """
+    current = {
+        "/etc/config/network": _md5(b"modified\n"),
+        "/etc/config/firewall": _md5(b"new\n"),
+    }
+    assert snapshot.changed_files(current) == [
+        "/etc/config/dhcp",
+        "/etc/config/network",
+    ]
+    assert snapshot.added_files(current) == ["/etc/config/firewall"]
+    assert snapshot.changed_files(dict(snapshot.digests)) == []
+
+
+def test_build_archive_subset(snapshot: ConfigSnapshot) -> None:
+    """Check the partial archive only holds the requested files.
+
+    :param snapshot: configuration snapshot
+    :type snapshot: ConfigSnapshot
+    """
+    archive = snapshot.build_archive(["/etc/config/dhcp"])
+    with tarfile.open(fileobj=io.BytesIO(archive), mode="r:gz") as tar:
+        members = {member.name: tar.extractfile(member).read() for member in tar}
+    assert members == {"./etc/config/dhcp": _FILES["etc/config/dhcp"]}
+
+
+def test_get_reload_commands() -> None:
+    """Check the reload commands of known, generic and non config files."""
+    assert get_reload_commands(
+        [
+            "/etc/config/dhcp",
+            "/etc/config/network",
+            "/etc/config/dhcp",
+            "/etc/rc.local",
+        ],
+    ) == [
+        "/etc/init.d/dnsmasq reload",
+        "/etc/init.d/odhcpd reload",
+        "[ -x /etc/init.d/network ] && /etc/init.d/network reload",
+    ]
@@ -0,0 +1,96 @@
+"""Unit tests of the conntrack and route table mirrors."""
+
+from __future__ import annotations
+
+from ipaddress import ip_address, ip_network
+
+import pytest
+from boardfarm3.exceptions import DeviceConnectionError
+
+from boardfarm3_openwrt.lib.table_watcher import ConntrackWatcher, RouteWatcher
+
+_MULTIPATH = (
+    "[ROUTE]default proto static metric 10",
+    "nexthop via 10.0.0.1 dev eth0 weight 1",
+    "nexthop via 10.0.1.1 dev eth1 weight 1",
+)
+
+
+def _feed(watcher: RouteWatcher | ConntrackWatcher, *lines: str) -> None:
+    """Apply dump or event lines to a watcher.
+
+    :param watcher: table watcher, not started
+    :type watcher: RouteWatcher | ConntrackWatcher
+    :param lines: stripped channel lines
+    :type lines: str
+    """
+    for line in lines:
+        watcher._apply_line(line)  # noqa: SLF001  # pylint: disable=protected-access
+
+
+def test_route_watcher_keeps_main_table() -> None:
+    """Check routes of the other tables reported by ip monitor are left out."""
+    watcher = RouteWatcher(hardware=None)
+    _feed(
+        watcher,
+        "[ROUTE]10.0.0.0/24 dev eth0 proto kernel scope link src 10.0.0.2",
+        "[ROUTE]local 10.0.0.2 dev eth0 table local proto kernel scope host",
+        "[ROUTE]blackhole 10.9.0.0/16 proto static",
+    )
+    assert {(route.route_type, route.destination) for route in watcher.routes} == {
+        ("unicast", ip_network("10.0.0.0/24")),
+        ("blackhole", ip_network("10.9.0.0/16")),
+    }
+
+
+def test_route_watcher_family_from_destination() -> None:
+    """Check IPv4 routes with an IPv6 gateway stay IPv4 default routes."""
+    watcher = RouteWatcher(hardware=None)
+    _feed(
+        watcher,
+        "[ROUTE]default via inet6 fe80::1 dev eth0 proto static",
+        "[ROUTE]default via fe80::1 dev eth0 proto static metric 1024 pref medium",
+        "[ROUTE]default dev pppoe-wan proto static scope link",
+    )
+    assert {(route.destination, route.device) for route in watcher.routes} == {
+        (ip_network("0.0.0.0/0"), "eth0"),
+        (ip_network("::/0"), "eth0"),
+        (ip_network("0.0.0.0/0"), "pppoe-wan"),
+    }
+
+
+def test_route_watcher_folds_multipath() -> None:
+    """Check unlabelled nexthop event lines are folded into their route."""
+    watcher = RouteWatcher(hardware=None)
+    _feed(watcher, *_MULTIPATH)
+    (route,) = watcher.routes
+    assert route.nexthops == (
+        (ip_address("10.0.0.1"), "eth0"),
+        (ip_address("10.0.1.1"), "eth1"),
+    )
+    _feed(watcher, _MULTIPATH[0].replace("]", "]Deleted ", 1), *_MULTIPATH[1:])
+    assert not watcher.routes
+
+
+def test_conntrack_watcher_find() -> None:
+    """Check entries are found by string addresses and destroyed by events."""
+    watcher = ConntrackWatcher(hardware=None)
+    flow = (
+        "tcp 6 SYN_SENT src=10.0.0.5 dst=1.1.1.1 sport=1000 dport=80 "
+        "src=1.1.1.1 dst=10.0.0.2 sport=80 dport=1000"
+    )
+    _feed(watcher, f"{flow.replace(' 6 ', ' 6 100 ')} [ASSURED]")
+    assert watcher.find(dst="1.1.1.1", dport=80)
+    _feed(watcher, f"[DESTROY] {flow}")
+    assert not watcher.entries
+
+
+def test_conntrack_watcher_overflow_is_stale() -> None:
+    """Check events dropped by the subscriber make the waits raise."""
+    watcher = ConntrackWatcher(hardware=None, subscribe_delay=5)
+    command = watcher._command  # noqa: SLF001  # pylint: disable=protected-access
+    assert "2>&1 | { sleep 5; conntrack -L;" in command
+    _feed(watcher, "WARNING: We have hit ENOBUFS! We are losing events.")
+    assert "ENOBUFS" in watcher.stale_reason
+    with pytest.raises(DeviceConnectionError, match="stale"):
+        watcher.wait_until(lambda ct: ct.find(dport=80), timeout=5)